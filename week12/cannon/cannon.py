@@ -113,7 +113,16 @@ class Target:
         :param other:
         :return:
         """
-        pass  #todo
+        dx, dy = other.x - self.x, other.y - self.y
+        dist = math.hypot(dx, dy)
+        if dist == 0 or dist >= self.r + other.r:
+            return
+        nx, ny = dx / dist, dy / dist
+        # Equal masses exchange the velocity components along the line of centers.
+        approach = (self.Vx - other.Vx) * nx + (self.Vy - other.Vy) * ny
+        if approach > 0:
+            self.Vx, self.Vy = self.Vx - approach * nx, self.Vy - approach * ny
+            other.Vx, other.Vy = other.Vx + approach * nx, other.Vy + approach * ny
 
 class Bomb:
     pass
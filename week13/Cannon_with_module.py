@@ -1,25 +1,85 @@
 import modification as m
+import physics
+import planes
+import collision
+import render
+import replay
+import profiler
+import aiming
+import assets
+import random
+from collections import namedtuple
+from itertools import compress
+import numpy as np
 import pygame as pg
-from random import randint, gauss
-
-pg.init()
-pg.font.init()
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 
 SCREEN_SIZE = (800, 600)
+TICK_RATE = 15  # simulation ticks per second
+FPS = 60
+MAX_STEPS = 5  # simulation ticks allowed per rendered frame when catching up
+WAVE_GAP = 30  # ticks between the last plane of a wave leaving and the next wave coming
+
+Mission = namedtuple('Mission', ['min_rad', 'max_rad', 'n_targets', 'n_rects', 'n_planes'])
+
+
+class Difficulty:
+    '''
+    Difficulty controller. Turns the score at the start of a mission into the mission's parameters,
+    the targets get smaller and the plane waves bigger as the score grows.
+    '''
+    def __init__(self, max_rad=30, n_rects=5, rect_size=(50, 25), max_planes=8, planes_step=5):
+        '''
+        Constructor method. Sets the radius of the targets at zero score, the number and the size of
+        the rectangle targets of a mission, the largest plane wave and the score adding a plane to it.
+        '''
+        self.max_rad = max_rad
+        self.n_rects = n_rects
+        self.rect_size = rect_size
+        self.max_planes = max_planes
+        self.planes_step = planes_step
+
+    def mission(self, score, n_targets):
+        '''
+        Returns the Mission for score with n_targets targets of each kind.
+        '''
+        score = max(0, score)
+        max_rad = max(1, self.max_rad - score)
+        min_rad = min(max_rad, max(1, self.max_rad - 2*score))
+        n_planes = min(self.max_planes, 1 + score // self.planes_step)
+        return Mission(min_rad, max_rad, n_targets, self.n_rects, n_planes)
+
 
 class ScoreTable:
     '''
-    Score table class.
+    Score table class. Keeps the rendered lines and redraws only the ones whose values changed.
+    Besides the shown values it counts the balls that hit at least one target and the destroyed
+    rectangle targets, which are included in t_destr.
     '''
-    def __init__(self, t_destr=0, b_used=0,h_score = 0):
+    font = None
+    lines = [("Destroyed: ", WHITE), ("Balls used: ", WHITE), ("Got hit: ", WHITE), ("Total: ", RED)]
+
+    def __init__(self, t_destr=0, b_used=0,h_score = 0, use_atlas=False):
         self.t_destr = t_destr
         self.b_used = b_used
-        self.font = pg.font.SysFont("dejavusansmono", 25)
         self.h_score = h_score
+        self.b_hit = 0
+        self.r_destr = 0
+        self.use_atlas = use_atlas
+        self.cache = [(None, None)] * len(self.lines)
+
+    @classmethod
+    def get_font(cls):
+        '''
+        Returns the font shared by all score tables.
+        '''
+        if cls.font is None:
+            pg.font.init()
+            cls.font = pg.font.SysFont("dejavusansmono", 25)
+        return cls.font
 
     def score(self):
         '''
@@ -27,183 +87,387 @@ class ScoreTable:
         '''
         return self.t_destr - self.b_used - self.h_score
 
+    def render_line(self, i, value):
+        '''
+        Renders line i with value, composing the number from the digit atlas if it is enabled.
+        '''
+        label, color = self.lines[i]
+        if self.use_atlas:
+            return render.DigitAtlas.get(self.get_font(), color).compose(label, value)
+        return self.get_font().render(label + str(value), True, color)
+
     def draw(self, screen):
-        score_surf = []
-        score_surf.append(self.font.render("Destroyed: {}".format(self.t_destr), True, WHITE))
-        score_surf.append(self.font.render("Balls used: {}".format(self.b_used), True, WHITE))
-        score_surf.append(self.font.render("Got hit: {}".format(self.h_score), True, WHITE))
-        score_surf.append(self.font.render("Total: {}".format(self.score()), True, RED))
-        
-        for i in range(4):
-            screen.blit(score_surf[i], [10, 10 + 30*i])
+        values = [self.t_destr, self.b_used, self.h_score, self.score()]
+        rects = []
+        for i, value in enumerate(values):
+            if self.cache[i][0] != value:
+                self.cache[i] = (value, self.render_line(i, value))
+            rects.append(screen.blit(self.cache[i][1], [10, 10 + 30*i]))
+        return rects
 
 class Manager:
     '''
     Class that manages events' handling, ball's motion and collision, target creation, etc.
     '''
-    def __init__(self, n_targets=1):
+    def __init__(self, n_targets=1, seed=None, difficulty=None, bomb_speed=(1, 5)):
+        '''
+        Constructor method. All randomness of the game comes from a generator seeded with seed,
+        so a game is reproduced by its seed and its input. difficulty is the Difficulty controller,
+        a default one if it is None, bomb_speed the range of the speeds of the targets' bombs.
+        '''
+        if seed is None:
+            seed = random.randrange(2**63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.recorder = None
+        self.profiler = profiler.FrameProfiler()
+        self.preview = None
         self.balls = []
         self.bombs = []
-        self.gun = m.Cannon()
-        self.rival = m.Rival_cannon()
+        self.gun = m.Cannon(coord=[30, SCREEN_SIZE[1]//2])
+        self.rival = m.Rival_cannon(coord=[770, SCREEN_SIZE[1]//2])
         self.targets = []
         self.rectangle_targets = []
         self.score_t = ScoreTable()
-        self.plane = m.Plane([0,0])
+        self.planes = planes.Squadron(SCREEN_SIZE)
         self.n_targets = n_targets
         self.bullets = []
+        # All projectiles live in one store and are moved, collided and drawn by team and kind
+        # in bulk. A kind is the name of the list of its view objects and their pool.
+        self.projectiles = physics.ProjectileStore(SCREEN_SIZE)
+        self.shell_pool = m.Pool(m.Shell, store=self.projectiles, rng=self.rng, grav=2)
+        self.bomb_pool = m.Pool(m.Bombs, store=self.projectiles)
+        self.bullet_pool = m.Pool(m.Bullet, store=self.projectiles)
+        self.kinds = [('bombs', self.bomb_pool), ('bullets', self.bullet_pool), ('balls', self.shell_pool)]
+        self.target_pools = {cls: m.Pool(cls, rng=self.rng, bomb_speed=bomb_speed) for cls in (m.MovingTargets, m.Target)}
+        self.rect_pool = m.Pool(m.RectangleTarget)
+        self.difficulty = Difficulty() if difficulty is None else difficulty
         self.new_mission()
         
         
 
     def new_mission(self):
         '''
-        Adds new targets.
+        Adds new targets with the parameters the difficulty controller gives for the current score.
+        The rectangle targets of the previous mission are retired. All targets come from pools.
         '''
-        for i in range(self.n_targets):
-            self.targets.append(m.MovingTargets(rad=randint(max(1, 30 - 2*max(0, self.score_t.score())),
-                30 - max(0, self.score_t.score()))))
-            self.targets.append(m.Target(rad=randint(max(1, 30 - 2*max(0, self.score_t.score())),
-                30 - max(0, self.score_t.score()))))
+        self.mission = mission = self.difficulty.mission(self.score_t.score(), self.n_targets)
+        randint = self.rng.randint
+        moving, still = self.target_pools[m.MovingTargets].get, self.target_pools[m.Target].get
+        for i in range(mission.n_targets):
+            self.targets.append(moving(rad=randint(mission.min_rad, mission.max_rad)))
+            self.targets.append(still(rad=randint(mission.min_rad, mission.max_rad)))
 
-        for i in range(5):  # Create 5 rectangle targets
-            width = 50  # Specify the width of the rectangle target
-            height = 25  # Specify the height of the rectangle target
-            x = randint(0, SCREEN_SIZE[0] - width)  # Generate random x-coordinate within screen width
-            y = randint(0, SCREEN_SIZE[1] - height)  # Generate random y-coordinate within screen height
-            self.rectangle_targets.append(m.RectangleTarget(width, height, x, y))  
+        for target in self.rectangle_targets:
+            self.rect_pool.put(target)
+        width, height = self.difficulty.rect_size
+        self.rectangle_targets = [self.rect_pool.get(width, height, randint(0, SCREEN_SIZE[0] - width),
+                                                     randint(0, SCREEN_SIZE[1] - height))
+                                  for i in range(mission.n_rects)]
 
-    def process(self, events, screen):
+    def process(self, events, screen=None, mouse_pos=None):
         '''
         Runs all necessary method for each iteration. Adds new targets, if previous are destroyed.
+        The gun aims at mouse_pos if it is given, otherwise at the real mouse. Nothing is drawn
+        if screen is None, so the manager can run without a display.
         '''
-        done = self.handle_events(events)
+        done = self.update(events, mouse_pos)
+        if screen is not None:
+            self.draw(screen)
+        return done
 
-        if pg.mouse.get_focused():
+    def update(self, events=(), mouse_pos=None):
+        '''
+        Advances the game by one simulation tick without drawing anything.
+        '''
+        if mouse_pos is None and pg.display.get_init() and pg.mouse.get_focused():
             mouse_pos = pg.mouse.get_pos()
-            self.gun.set_angle(mouse_pos)
+        return self.step(replay.encode_events(events), mouse_pos)
+
+    def step(self, codes=(), aim=None):
+        '''
+        Advances the game by one simulation tick with the input codes of the tick and the aim point.
+        Records the tick, if a recorder is attached. The aim point is clamped to the coordinates
+        a recording can hold, so the game and its replay aim the same way.
+        '''
+        if aim is not None:
+            limit = replay.AIM_LIMIT
+            aim = (min(max(int(aim[0]), -limit), limit), min(max(int(aim[1]), -limit), limit))
+        with self.profiler.phase('events'):
+            done = self.handle_codes(codes)
+
+        if aim is not None:
+            self.gun.set_angle(aim)
         
-        self.move()
-        self.collide()
-        self.draw(screen)
+        with self.profiler.phase('move'):
+            self.move()
+        with self.profiler.phase('collide'):
+            self.collide()
 
         if len(self.targets) == 0 and len(self.balls) == 0:
             self.new_mission()
 
+        if self.recorder is not None:
+            self.recorder.record(codes, aim, self.state_hash())
         return done
 
+    def counts(self):
+        '''
+        Returns the number of objects of every kind.
+        '''
+        counts = {name: len(getattr(self, name)) for name, pool in self.kinds}
+        return {**counts, 'targets': len(self.targets), 'rects': len(self.rectangle_targets), 'planes': len(self.planes)}
+
+    def state_hash(self):
+        '''
+        Returns a hash of the score, of the positions of all objects and of the targets' velocities.
+        '''
+        objects = self.balls + self.bombs + self.bullets + self.targets + [self.gun, self.rival]
+        return replay.state_hash([self.score_t.t_destr, self.score_t.b_used, self.score_t.h_score],
+                                 [self.gun.angle, self.gun.pow],
+                                 [list(obj.coord) for obj in objects],
+                                 self.planes.pos[self.planes.live()],
+                                 [target.rect.topleft for target in self.rectangle_targets],
+                                 [(getattr(target, 'vx', 0), getattr(target, 'vy', 0)) for target in self.targets])
+
     def handle_events(self, events):
         '''
         Handles events from keyboard, mouse, etc.
         '''
+        return self.handle_codes(replay.encode_events(events))
+
+    def handle_codes(self, codes):
+        '''
+        Handles input codes of one tick.
+        '''
         done = False
-        for event in events:
-            if event.type == pg.QUIT:
+        for code in codes:
+            if code == replay.QUIT:
                 done = True
-            elif event.type == pg.KEYDOWN:
-                if event.key == pg.K_UP:
-                    self.gun.move(0,-5)
-                if event.key == pg.K_LEFT:
-                    self.gun.move(-5,0)
-                if event.key == pg.K_RIGHT:
-                    self.gun.move(5,0)
-                elif event.key == pg.K_DOWN:
-                    self.gun.move(0,5)
-            elif event.type == pg.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    self.gun.activate()
-            elif event.type == pg.MOUSEBUTTONUP:
-                if event.button == 1:
-                    self.balls.append(self.gun.strike())
-                    for target in self.targets:
-                        self.bombs.append(target.strike())
-                    self.bullets.append(self.rival.strike())
-                    self.score_t.b_used += 1
+            elif code == replay.UP:
+                self.gun.move(0,-5)
+            elif code == replay.LEFT:
+                self.gun.move(-5,0)
+            elif code == replay.RIGHT:
+                self.gun.move(5,0)
+            elif code == replay.DOWN:
+                self.gun.move(0,5)
+            elif code == replay.FIRE_DOWN:
+                self.gun.activate()
+            elif code == replay.FIRE_UP:
+                self.balls.append(self.gun.strike(self.shell_pool))
+                for target in self.targets:
+                    self.bombs.append(target.strike(self.bomb_pool))
+                self.bullets.append(self.rival.strike(self.bullet_pool))
+                self.score_t.b_used += 1
 
         return done
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
+        '''
+        Runs bombs', bullets', balls', gun's, targets', rectangle targets', planes' and score table's drawing method.
+        Moving objects are drawn at alpha of the way from their previous to their current position.
+        Every kind of projectile and the targets are layers of sprites, each drawn with one Surface.blits call.
+        Returns the list of drawn rects.
+        '''
+        rects = []
+        for name, pool in self.kinds:
+            rects.extend(screen.blits(m.store_sprites(getattr(self, name), self.projectiles, alpha)))
+        rects.extend(screen.blits([target.sprite(alpha) for target in self.targets]))
+        for target in self.rectangle_targets:
+            rects.append(target.draw(screen, alpha))
+        if self.preview is not None and self.gun.active:
+            rects.append(self.preview.draw(screen, self.gun))
+        rects.append(self.gun.draw(screen, alpha))
+        rects.append(self.rival.draw(screen, alpha))
+        rects.extend(screen.blits(self.planes.sprites(alpha)))
+        rects.extend(self.score_t.draw(screen))
+        return rects
+
+    @staticmethod
+    def reap(objects, pool, store):
         '''
-        Runs balls', gun's, targets' and score table's drawing method.
+        Removes dead objects from the list in place and returns them to the pool. The alive flags
+        of all their slots are read from the store at once, the list is rebuilt only if some died.
         '''
-        for ball in self.balls:
-            ball.draw(screen)
-        for target in self.targets:
-            target.draw(screen)
-        self.gun.draw(screen)
-        self.rival.draw(screen)
-        self.plane.draw(screen)
-        self.score_t.draw(screen)
+        if not objects:
+            return
+        alive = store.alive[[obj.slot for obj in objects]]
+        if alive.all():
+            return
+        for obj in compress(objects, ~alive):
+            pool.put(obj)
+        objects[:] = compress(objects, alive)
 
     def move(self):
         '''
-        Runs balls' and gun's movement method, removes dead balls.
+        Runs targets' and gun's movement method, moves all projectiles in one step of their store
+        and removes the dead ones of every kind. The planes move along their paths, a new wave
+        of the mission's size is sent once the last one has left.
         '''
-        self.plane.move()
-        dead_balls = []
-        for i, ball in enumerate(self.balls):
-            ball.move(grav=2)
-            if not ball.is_alive:
-                dead_balls.append(i)
-        for i in reversed(dead_balls):
-            self.balls.pop(i)
+        self.planes.step()
+        if not len(self.planes):
+            planes.wave(self.planes, self.rng, self.mission.n_planes, delay=WAVE_GAP)
+        self.projectiles.step()
+        for name, pool in self.kinds:
+            self.reap(getattr(self, name), pool, self.projectiles)
         for i, target in enumerate(self.targets):
             target.move()
+        self.bounce_targets()
         for target in self.rectangle_targets:
             target.move()
-        for bomb in self.bombs:
-            bomb.draw(screen)
-            bomb.move()
-        for bullet in self.bullets:
-            bullet.draw(screen)
-            bullet.move()
         self.rival.move(self.gun)
         
         self.gun.gain()
 
+    def bounce_targets(self):
+        '''
+        Resolves collisions between targets as elastic collisions of rigid circles with masses
+        proportional to their area. Targets that can't move are immovable. Candidate pairs come
+        from a sort and sweep on x, so crowds of targets cost about O(n log n).
+        '''
+        if len(self.targets) < 2:
+            return
+        pos, rad = collision.circles(self.targets)
+        moving = np.array([isinstance(target, m.MovingTargets) for target in self.targets])
+        vel = np.array([(target.vx, target.vy) if is_moving else (0, 0)
+                        for target, is_moving in zip(self.targets, moving)], dtype=float)
+        inv_mass = np.where(moving, 1 / np.maximum(rad, 1)**2, 0)
+        moved = collision.resolve_elastic(pos, vel, rad, inv_mass, *collision.sweep_pairs(pos, rad))
+        for k in moved.tolist():
+            target = self.targets[k]
+            target.coord[0], target.coord[1] = pos[k].tolist()
+            target.vx, target.vy = vel[k].tolist()
+
     def collide(self):
         '''
-        Checks whether balls bump into targets, sets balls' alive trigger.
+        Checks whether balls bump into targets and rectangle targets and bombs, bullets or planes bump into the gun.
+        The checks are continuous: everything moves along a segment from its previous position,
+        so fast shells can't tunnel through small targets. Only the balls and targets whose
+        swept circles share a cell of the spatial hash are checked, in one batch per group.
         '''
-        collisions = []
-        targets_c = []
-        
-        for i, ball in enumerate(self.balls):
-            for j, target in enumerate(self.targets):
-                if target.check_collision(ball):
-                    collisions.append([i, j])
-                    targets_c.append(j)
-        targets_c.sort()
-        for j in reversed(targets_c):
-            self.score_t.t_destr += 1
-            self.targets.pop(j)
+        start, end, rad = collision.paths(self.targets)
+        store = self.projectiles
+        player = store.live(m.PLAYER)
+        ball_start, ball_end, ball_rad = store.prev[player], store.pos[player], store.rad[player]
+        center, bound = collision.swept_bounds(start, end, rad)
+        ball_center, ball_bound = collision.swept_bounds(ball_start, ball_end, ball_rad)
+        cell_size = 2 * max(bound.max(initial=0), ball_bound.max(initial=0))
+        grid = collision.SpatialHash.from_circles(center, bound, cell_size)
+        hits = collision.swept_pairs(ball_start, ball_end, ball_rad, start, end, rad,
+                                     *grid.pairs(ball_center, ball_bound))
+        struck = [hits.a]
+        targets_c = set(hits.b.tolist())
+        self.score_t.t_destr += len(targets_c)
+        for j in targets_c:
+            self.target_pools[type(self.targets[j])].put(self.targets[j])
+        self.targets = [target for j, target in enumerate(self.targets) if j not in targets_c]
 
-        for i,bomb in enumerate(self.bombs):
-            if(self.gun.check_collision(bomb)):
-                self.score_t.h_score += 1
+        # Rectangle targets are found among the boxes bounding the balls' swept circles by sorted intervals.
+        box_start, box_end = collision.boxes(self.rectangle_targets)
+        swept = np.c_[np.minimum(box_start[:, :2], box_end[:, :2]), np.maximum(box_start[:, 2:], box_end[:, 2:])]
+        ball_boxes = np.c_[ball_center - ball_bound[:, None], ball_center + ball_bound[:, None]]
+        hits = collision.swept_box_pairs(ball_start, ball_end, ball_rad, box_start, box_end,
+                                         *collision.box_pairs(ball_boxes, swept))
+        struck.append(hits.a)
+        rects_c = set(hits.b.tolist())
+        self.score_t.t_destr += len(rects_c)
+        self.score_t.r_destr += len(rects_c)
+        # A ball counts as a hitting shot the first time it hits anything.
+        struck = player[np.concatenate(struck)]
+        self.score_t.b_hit += len(np.unique(struck[~store.struck[struck]]))
+        store.struck[struck] = True
+        for j in rects_c:
+            self.rect_pool.put(self.rectangle_targets[j])
+        self.rectangle_targets = [target for j, target in enumerate(self.rectangle_targets) if j not in rects_c]
 
-        for i, bullet in enumerate(self.bullets):
-            if(self.gun.check_collision(bullet)):
-                self.score_t.h_score += 1
+        # There is a single gun, so the enemy projectiles and the planes are checked against it
+        # in one batch without a grid.
+        enemy = store.live(m.ENEMY)
+        squadron = self.planes
+        shown = squadron.live()
+        start = np.r_[store.prev[enemy], squadron.prev[shown]]
+        end = np.r_[store.pos[enemy], squadron.pos[shown]]
+        rad = np.r_[store.rad[enemy], squadron.rad[shown]]
+        keys = np.arange(len(rad))
+        hits = collision.swept_pairs(start, end, rad, [self.gun.coord], [self.gun.coord], [0], keys, 0*keys)
+        self.score_t.h_score += len(hits.a)
+        store.alive[enemy[hits.a[hits.a < len(enemy)]]] = False
 
-        if(self.gun.check_collision(self.plane)):
-            self.score_t.h_score += 1
+def main(record=None, profile=False, trace=None, preview=False, palette=False):
+    '''
+    Runs the game in a window. The session is recorded to the file record, if it is given.
+    With profile the frame profiler overlay is shown, F3 toggles it. The profiler's trace
+    is written to the file trace on exit, if it is given. With preview the trajectory of
+    the shot is drawn while the gun charges. With palette shells and targets are drawn in the
+    nearest colors of m.COLORS, which keeps the number of circle sprites small.
+    '''
+    pg.init()
+    screen = pg.display.set_mode(SCREEN_SIZE)
+    pg.display.set_caption("The gun of Khiryanov")
 
-screen = pg.display.set_mode(SCREEN_SIZE)
-pg.display.set_caption("The gun of Khiryanov")
+    done = False
+    clock = pg.time.Clock()
 
-done = False
-clock = pg.time.Clock()
+    mgr = Manager(n_targets=3)
+    if record is not None:
+        mgr.recorder = replay.Recorder(record, mgr.seed, mgr.n_targets)
+    renderer = render.DirtyRenderer(screen, BLACK)
+    if palette:
+        assets.circles.palette = m.COLORS
+    if preview:
+        mgr.preview = aiming.TrajectoryPreview(mgr.projectiles, refl=mgr.shell_pool.kwargs.get('refl'))
+    prof = mgr.profiler
+    prof.enabled = profile or trace is not None
+    overlay = profile
 
-mgr = Manager(n_targets=3)
+    # The game is simulated with a fixed tick of 1/TICK_RATE seconds and drawn at up to FPS
+    # frames per second, interpolating between the last two ticks.
+    tick = 1 / TICK_RATE
+    lag = 0.0
+    events = []
+    while not done:
+        lag += clock.tick(FPS) / 1000
+        for event in pg.event.get():
+            if event.type == pg.KEYDOWN and event.key == pg.K_F3:
+                overlay = not overlay
+                prof.enabled = overlay or trace is not None
+                renderer.invalidate()
+            else:
+                events.append(event)
 
-while not done:
-    clock.tick(15)
-    screen.fill(BLACK)
+        steps = 0
+        while lag >= tick and steps < MAX_STEPS and not done:
+            done = mgr.update(events)
+            events = []
+            lag -= tick
+            steps += 1
+        if steps == MAX_STEPS:
+            lag = min(lag, tick)
 
-    done = mgr.process(pg.event.get(), screen)
+        renderer.clear()
+        with prof.phase('draw'):
+            rects = mgr.draw(screen, lag / tick)
+        if overlay:
+            rects.append(prof.draw(screen, budget=1/FPS))
+        with prof.phase('display'):
+            renderer.update(rects)
+        prof.end_frame(**mgr.counts())
 
-    pg.display.update()
+    if mgr.recorder is not None:
+        mgr.recorder.close()
+    if trace is not None:
+        prof.dump(trace)
+    pg.quit()
 
 
-pg.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--record', help='file to record the session to')
+    parser.add_argument('--profile', action='store_true', help='show the frame profiler overlay')
+    parser.add_argument('--trace', help='file to write the profiler trace to (.csv, .trace.json or .json)')
+    parser.add_argument('--preview', action='store_true', help='draw the trajectory of the shot while charging')
+    parser.add_argument('--palette', action='store_true', help='draw shells and targets in a fixed palette')
+    args = parser.parse_args()
+    main(args.record, args.profile, args.trace, args.preview, args.palette)
\ No newline at end of file
@@ -0,0 +1,236 @@
+'''
+Ballistic aim solver. A firing table rolls out the shell physics once for every launch velocity
+the gun can produce from a given position and indexes the trajectories by screen cell, so
+finding the angle and power that hit a point is an array lookup.
+'''
+from collections import namedtuple, OrderedDict
+from functools import lru_cache
+import numpy as np
+import pygame as pg
+import physics
+
+Solution = namedtuple('Solution', ['angle', 'pow', 'vel', 'tick'])
+
+
+class FiringTable:
+    '''
+    Firing table of a gun at origin. Launch velocities are the integer (vx, vy) pairs produced by
+    Cannon.strike for every reachable (power, angle); each of them is kept with the lowest power and
+    a representative angle giving it. Trajectories follow ProjectileStore.step exactly.
+    '''
+    def __init__(self, origin, size=(800, 600), min_pow=10, max_pow=50, inc=2, grav=2, rad=20,
+                 horizon=120, cell=8, n_angles=4096, refl_ort=0.8, refl_par=0.9):
+        '''
+        Constructor method. Simulates all launch velocities for horizon ticks with the shells' rebounce
+        coefficients and builds the cell index.
+        '''
+        self.origin = tuple(origin)
+        self.size = size
+        self.cell = cell
+        self.grav = grav
+        self.rad = rad
+        self.horizon = horizon
+
+        powers = np.arange(min_pow, max_pow + 1, inc)
+        if powers[-1] < max_pow:
+            powers = np.append(powers, powers[-1] + inc)
+        angles = np.linspace(-np.pi, np.pi, n_angles, endpoint=False)
+        p, a = [grid.ravel() for grid in np.meshgrid(powers, angles, indexing='ij')]
+        vx, vy = np.trunc(p * np.cos(a)), np.trunc(p * np.sin(a))
+        order = np.lexsort((a, p, vy, vx))
+        p, a, vx, vy = p[order], a[order], vx[order], vy[order]
+        # Runs of equal (vx, vy, pow); the first run of every velocity has its lowest power.
+        group = np.flatnonzero(np.r_[True, (vx[1:] != vx[:-1]) | (vy[1:] != vy[:-1]) | (p[1:] != p[:-1])])
+        count = np.diff(np.r_[group, len(p)])
+        first = np.r_[True, (vx[group][1:] != vx[group][:-1]) | (vy[group][1:] != vy[group][:-1])]
+        pick = group[first] + count[first] // 2
+        self.pow = p[pick].astype(int)
+        self.angle = a[pick]
+        self.vel = np.stack([vx[pick], vy[pick]], axis=1)
+
+        self.path = rollout(origin, self.vel, grav, rad, horizon, size, refl_ort, refl_par)
+        self.build_index()
+
+    def build_index(self):
+        '''
+        For every screen cell finds the trajectory reaching it first and the tick it happens at.
+        '''
+        cols, rows = -(-self.size[0] // self.cell), -(-self.size[1] // self.cell)
+        n, ticks = self.path.shape[:2]
+        traj, tick = [grid.ravel() for grid in np.meshgrid(np.arange(n), np.arange(1, ticks + 1), indexing='ij')]
+        points = self.path.reshape(-1, 2)
+        valid = ~np.isnan(points[:, 0])
+        traj, tick, points = traj[valid], tick[valid], points[valid]
+        cx = np.clip((points[:, 0] // self.cell).astype(int), 0, cols - 1)
+        cy = np.clip((points[:, 1] // self.cell).astype(int), 0, rows - 1)
+        cell = cx * rows + cy
+        order = np.lexsort((self.pow[traj], tick, cell))
+        cell, first = np.unique(cell[order], return_index=True)
+        self.index = np.full(cols * rows, -1)
+        self.index_tick = np.zeros(cols * rows, dtype=int)
+        self.index[cell] = traj[order][first]
+        self.index_tick[cell] = tick[order][first]
+        self.rows = rows
+
+    def lookup(self, point):
+        '''
+        Returns the Solution reaching the cell of point first, or None if no shot gets there.
+        '''
+        x, y = point
+        if not (0 <= x < self.size[0] and 0 <= y < self.size[1]):
+            return None
+        k = int(x // self.cell) * self.rows + int(y // self.cell)
+        i = self.index[k]
+        if i < 0:
+            return None
+        return Solution(float(self.angle[i]), int(self.pow[i]), tuple(int(v) for v in self.vel[i]),
+                        int(self.index_tick[k]))
+
+    def solve(self, point, velocity=(0, 0), delay=0, iterations=3):
+        '''
+        Returns the Solution hitting a target at point moving with velocity per tick, fired after
+        delay ticks plus the ticks needed to charge the gun from its minimum power. The target
+        position is predicted from the flight time of the previous guess a few times.
+        '''
+        solution = self.lookup(point)
+        for i in range(iterations):
+            if solution is None or velocity == (0, 0):
+                break
+            ticks = delay + (solution.pow - self.pow.min()) // 2 + solution.tick
+            solution = self.lookup((point[0] + velocity[0] * ticks, point[1] + velocity[1] * ticks))
+        return solution
+
+
+class Rollout:
+    '''
+    Shells launched from origin with velocities vel, moved by the same ProjectileStore the game uses.
+    path has the positions of shape (len(vel), horizon, 2), NaN from the tick a shell dies, as dead
+    shells are removed before collisions are checked. Its first ticks ticks are filled.
+    '''
+    def __init__(self, origin, vel, grav=2, rad=20, horizon=120, size=(800, 600), refl_ort=0.8, refl_par=0.9):
+        '''
+        Constructor method. Launches the shells, no tick is simulated yet.
+        '''
+        self.store = physics.ProjectileStore(size, refl_ort, refl_par, capacity=max(len(vel), 1))
+        for v in vel:
+            self.store.add(origin, v, rad)
+        self.grav = grav
+        self.path = np.full((len(vel), horizon, 2), np.nan, dtype=np.float32)
+        self.ticks = 0
+
+    def advance(self, steps=None):
+        '''
+        Simulates up to steps more ticks, all the remaining ones by default. Returns self.
+        '''
+        n, horizon = self.path.shape[:2]
+        end = horizon if steps is None else min(horizon, self.ticks + steps)
+        for tick in range(self.ticks, end):
+            self.store.step(grav=self.grav)
+            alive = self.store.alive[:n]
+            if not alive.any():
+                end = horizon
+                break
+            self.path[alive, tick] = self.store.pos[:n][alive]
+        self.ticks = end
+        return self
+
+
+def rollout(origin, vel, grav=2, rad=20, horizon=120, size=(800, 600), refl_ort=0.8, refl_par=0.9):
+    '''
+    Returns the positions of shells launched from origin with velocities vel for horizon ticks,
+    see Rollout.
+    '''
+    return Rollout(origin, vel, grav, rad, horizon, size, refl_ort, refl_par).advance().path
+
+
+class TrajectoryPreview:
+    '''
+    Trajectory line of a charging gun. The shots of all powers along the gun's angle are rolled
+    out together on the game's shell store settings and cached by their launch velocities, so
+    charging only switches to another path and aiming back at a seen direction costs nothing.
+    A new rollout is advanced at most steps ticks a frame, the line grows over a few frames
+    instead of stalling one.
+    '''
+    def __init__(self, store, grav=2, rad=20, horizon=120, steps=30, inc=2, cache_size=32, color=(90, 90, 90),
+                 refl=None):
+        '''
+        Constructor method. store is the shell store of the game the gun fires into, refl the rebounce
+        coefficients of the shells if they have their own.
+        '''
+        self.store = store
+        self.grav = grav
+        self.rad = rad
+        self.refl = refl
+        self.horizon = horizon
+        self.steps = steps
+        self.inc = inc
+        self.cache_size = cache_size
+        self.color = color
+        self.cache = OrderedDict()
+        self.last = None
+
+    def rollout_for(self, cannon):
+        '''
+        Returns the Rollout of the gun's current angle and position.
+        '''
+        key = (cannon.angle, tuple(cannon.coord), cannon.min_pow, cannon.max_pow)
+        if self.last is not None and self.last[0] == key:
+            return self.last[1]
+        powers = np.arange(cannon.min_pow, cannon.max_pow + self.inc, self.inc)
+        vel = np.stack([np.trunc(powers * np.cos(cannon.angle)), np.trunc(powers * np.sin(cannon.angle))], axis=1)
+        store = self.store
+        refl_ort, refl_par = (store.refl_ort, store.refl_par) if self.refl is None else self.refl
+        vel_key = (tuple(cannon.coord), vel.tobytes(), store.size, refl_ort, refl_par)
+        if vel_key in self.cache:
+            self.cache.move_to_end(vel_key)
+        else:
+            self.cache[vel_key] = Rollout(cannon.coord, vel, self.grav, self.rad, self.horizon,
+                                          store.size, refl_ort, refl_par)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        self.last = (key, self.cache[vel_key])
+        return self.last[1]
+
+    def path(self, cannon):
+        '''
+        Returns the known positions of the shell the gun would fire now.
+        '''
+        rollout = self.rollout_for(cannon).advance(self.steps)
+        i = min((cannon.pow - cannon.min_pow) // self.inc, len(rollout.path) - 1)
+        points = rollout.path[i, :rollout.ticks]
+        return points[~np.isnan(points[:, 0])]
+
+    def draw(self, screen, cannon):
+        '''
+        Draws the preview line from the gun. Returns the drawn rect.
+        '''
+        points = [tuple(cannon.coord)] + self.path(cannon).tolist()
+        if len(points) < 2:
+            return None
+        return pg.draw.lines(screen, self.color, False, points)
+
+
+@lru_cache(maxsize=16)
+def table_for(origin, **options):
+    '''
+    Returns the firing table of a gun at origin, building it on the first request.
+    '''
+    return FiringTable(origin, **options)
+
+
+def aim(cannon, target, delay=0, reach=4000, refl=None):
+    '''
+    Returns the Solution for cannon to hit target, moving targets are led by their velocity,
+    together with an aim point along the solution's angle that Manager.step can take.
+    refl is the pair of the shells' rebounce coefficients if they have their own.
+    Returns (None, None) if the target can't be hit.
+    '''
+    options = {} if refl is None else {'refl_ort': refl[0], 'refl_par': refl[1]}
+    table = table_for(tuple(int(c) for c in cannon.coord), min_pow=cannon.min_pow, max_pow=cannon.max_pow,
+                      **options)
+    velocity = (getattr(target, 'vx', 0), getattr(target, 'vy', 0))
+    solution = table.solve(target.coord, velocity, delay)
+    if solution is None:
+        return None, None
+    x, y = cannon.coord
+    return solution, (x + reach * np.cos(solution.angle), y + reach * np.sin(solution.angle))
@@ -0,0 +1,138 @@
+import os
+from collections import OrderedDict
+import pygame as pg
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_images = {}
+
+
+def load_image(path, size=None):
+    '''
+    Returns the image stored at path, scaled to size. Every (path, size) pair is
+    loaded from disk, converted and scaled only once per process, all later calls
+    share the same surface, so callers must not draw on it.
+    '''
+    key = (path, None if size is None else tuple(size))
+    entry = _images.get(key)
+    if entry is None or (not entry[1] and pg.display.get_surface() is not None):
+        image = pg.image.load(os.path.join(ASSET_DIR, path))
+        if size is not None:
+            image = pg.transform.scale(image, size)
+        # convert_alpha() needs a video mode, images loaded before it is set
+        # are converted on the first request made after.
+        converted = pg.display.get_surface() is not None
+        if converted:
+            image = image.convert_alpha()
+        entry = _images[key] = (image, converted)
+    return entry[0]
+
+
+class CircleCache:
+    '''
+    LRU-bounded cache of filled circle sprites keyed by radius and color. With a palette, colors
+    are replaced by the nearest palette color first, so shells of random colors share a few
+    sprites. Counts hits, misses and evictions; if more sprites than maxsize are on the screen
+    every frame, they evict each other and the hit rate drops to zero, the palette fixes that.
+    '''
+    def __init__(self, maxsize=2048, palette=None):
+        '''
+        Constructor method. Sets the maximum number of kept sprites and the palette, a list of colors.
+        '''
+        self.maxsize = maxsize
+        self.palette = palette
+        self.sprites = OrderedDict()
+        self.nearest = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, color):
+        '''
+        Returns the palette color nearest to color, or color itself without a palette.
+        '''
+        color = tuple(color)
+        if not self.palette:
+            return color
+        if color not in self.nearest:
+            if len(self.nearest) >= 4096:
+                self.nearest.clear()
+            self.nearest[color] = min((tuple(c) for c in self.palette),
+                                      key=lambda c: sum((a - b)**2 for a, b in zip(c, color)))
+        return self.nearest[color]
+
+    def get(self, rad, color):
+        '''
+        Returns a filled circle of radius rad on a surface of size 2*rad. Blitted at (x - rad, y - rad)
+        with integer x and y, it gives the same pixels as pg.draw.circle centered at (x, y).
+        The corners are a run-length encoded color key, which blits faster than per-pixel alpha.
+        '''
+        key = (int(rad), self.quantize(color))
+        entry = self.sprites.get(key)
+        if entry is not None and (entry[1] or pg.display.get_surface() is None):
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return entry[0]
+        self.misses += 1
+        rad, color = key
+        transparent = (255, 0, 255) if color[:3] != (255, 0, 255) else (0, 0, 0)
+        image = pg.Surface((2 * rad, 2 * rad))
+        image.fill(transparent)
+        pg.draw.circle(image, color, (rad, rad), rad)
+        image.set_colorkey(transparent, pg.RLEACCEL)
+        converted = pg.display.get_surface() is not None
+        if converted:
+            image = image.convert()
+        self.sprites[key] = (image, converted)
+        self.sprites.move_to_end(key)
+        if len(self.sprites) > self.maxsize:
+            self.sprites.popitem(last=False)
+            self.evictions += 1
+        return image
+
+    def stats(self):
+        '''
+        Returns the hit, miss and eviction counts, the hit rate and the number of kept sprites.
+        '''
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0, 'size': len(self.sprites)}
+
+    def clear(self):
+        '''
+        Drops every sprite and resets the counts.
+        '''
+        self.sprites.clear()
+        self.nearest.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+circles = CircleCache()
+
+
+def circle(rad, color):
+    '''
+    Returns the circle sprite of radius rad and color from the shared cache, see CircleCache.get.
+    '''
+    return circles.get(rad, color)
+
+
+def clear():
+    '''
+    Drops every cached image and circle sprite.
+    '''
+    _images.clear()
+    circles.clear()
+
+
+class Image:
+    '''
+    Class attribute giving the cached image at path scaled to size. All instances of the
+    class share the surface without keeping a reference to it each.
+    '''
+    def __init__(self, path, size=None):
+        self.path = path
+        self.size = size
+
+    def __get__(self, obj, objtype=None):
+        return load_image(self.path, self.size)
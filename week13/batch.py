@@ -0,0 +1,256 @@
+'''
+Batch simulator for balance runs. Plays many headless episodes with a scripted shooter
+on all cores, streams the results to a columnar NumPy archive and prints aggregated statistics.
+
+    python batch.py --episodes 1000 --ticks 900 --out results.npz --refl-ort 0.7
+    python batch.py --bomb-speed 2 8 --max-rad 40 --n-rects 3
+
+The archive has an array per column, np.load('results.npz')['score'] gives all scores.
+'''
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import Cannon_with_module as game
+import aiming
+import replay
+
+# Balance parameters passed to the Difficulty controller.
+DIFFICULTY = ('max_rad', 'n_rects', 'rect_size', 'max_planes', 'planes_step')
+FIELDS = ['seed', 'status', 'score', 'shots', 'hits', 'kills', 'rect_kills', 'got_hit', 'ticks', 'duration_s']
+
+
+class Shooter:
+    '''
+    Scripted player. Picks the nearest target the firing table can reach, aims along the solved
+    angle, charges the gun to the solved power and fires, then waits for the cooldown.
+    The firing table uses the shells' own rebounce coefficients.
+    '''
+    def __init__(self, cooldown=5):
+        self.cooldown = cooldown
+        self.wait = 0
+
+    def act(self, mgr):
+        '''
+        Returns the input codes and the aim point for the next tick.
+        '''
+        gun = mgr.gun
+        refl = mgr.shell_pool.kwargs.get('refl')
+        targets = sorted(mgr.targets, key=lambda t: (t.coord[0] - gun.coord[0])**2 + (t.coord[1] - gun.coord[1])**2)
+        for target in targets:
+            solution, aim = aiming.aim(gun, target, refl=refl)
+            if solution is not None:
+                break
+        else:
+            return [], None
+        if self.wait > 0:
+            self.wait -= 1
+            return [], aim
+        if not gun.active:
+            return [replay.FIRE_DOWN], aim
+        if gun.pow >= solution.pow:
+            self.wait = self.cooldown
+            return [replay.FIRE_UP], aim
+        return [], aim
+
+
+def new_manager(seed, params):
+    '''
+    Returns a new manager for the episode seed with the balance parameters applied.
+    '''
+    difficulty = game.Difficulty(**{name: params[name] for name in DIFFICULTY if name in params})
+    mgr = game.Manager(n_targets=params.get('n_targets', 3), seed=seed, difficulty=difficulty,
+                       bomb_speed=params.get('bomb_speed', (1, 5)))
+    configure(mgr, params)
+    return mgr
+
+
+def configure(mgr, params):
+    '''
+    Applies balance parameters to a new manager. The rebounce coefficients are given to the shells only.
+    '''
+    if 'refl_ort' in params or 'refl_par' in params:
+        store = mgr.projectiles
+        mgr.shell_pool.kwargs['refl'] = (params.get('refl_ort', store.refl_ort), params.get('refl_par', store.refl_par))
+
+
+def episode(seed, ticks, params, marks=None):
+    '''
+    Plays one episode and returns its result row. While it runs, a file named after the seed
+    exists in the directory marks, so the episodes running when a worker died can be found.
+    '''
+    mark = None if marks is None else os.path.join(marks, str(seed))
+    if mark:
+        open(mark, 'w').close()
+    start = time.perf_counter()
+    mgr = new_manager(seed, params)
+    shooter = Shooter()
+    for tick in range(ticks):
+        mgr.step(*shooter.act(mgr))
+    score = mgr.score_t
+    row = {'seed': seed, 'status': 'ok', 'score': score.score(), 'shots': score.b_used, 'hits': score.b_hit,
+           'kills': score.t_destr, 'rect_kills': score.r_destr, 'got_hit': score.h_score, 'ticks': ticks,
+           'duration_s': time.perf_counter() - start}
+    if mark:
+        os.remove(mark)
+    return row
+
+
+class ColumnWriter:
+    '''
+    Writes result rows to a compressed NumPy archive with an array per field; failed episodes
+    have NaN in the numeric columns. The archive is rewritten every flush_every rows and on close
+    through a temporary file, so a crash leaves the last complete archive behind.
+    '''
+    def __init__(self, path, fields=FIELDS, flush_every=100):
+        self.path = path
+        self.fields = fields
+        self.flush_every = flush_every
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) % self.flush_every == 0:
+            self.flush()
+
+    def columns(self):
+        '''
+        Returns the arrays of all columns.
+        '''
+        columns = {'seed': np.array([row['seed'] for row in self.rows], dtype=np.int64),
+                   'status': np.array([row['status'] for row in self.rows], dtype=str)}
+        for name in self.fields:
+            if name not in columns:
+                columns[name] = np.array([np.nan if row[name] == '' else row[name] for row in self.rows], dtype=float)
+        return columns
+
+    def flush(self):
+        temp = self.path + '.tmp'
+        with open(temp, 'wb') as file:
+            np.savez_compressed(file, **self.columns())
+        os.replace(temp, self.path)
+
+    def close(self):
+        self.flush()
+
+
+def failed(seed, status):
+    row = dict.fromkeys(FIELDS, '')
+    row.update(seed=seed, status=status)
+    return row
+
+
+def play(seeds, ticks, params, workers, marks, write):
+    '''
+    Plays the seeds on a process pool and writes the results. Episodes raising an exception
+    are written as errors. Returns the seeds left unfinished because a worker died and
+    the ones among them that were running at that moment.
+    '''
+    finished = set()
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(episode, seed, ticks, params, marks): seed for seed in seeds}
+        try:
+            for future in as_completed(futures):
+                seed = futures[future]
+                try:
+                    write(future.result())
+                except BrokenProcessPool:
+                    raise
+                except Exception as error:
+                    write(failed(seed, 'error: {}'.format(error)))
+                finished.add(seed)
+        except BrokenProcessPool:
+            pass
+    unfinished = [seed for seed in seeds if seed not in finished]
+    running = {int(name) for name in os.listdir(marks)}
+    for name in os.listdir(marks):
+        os.remove(os.path.join(marks, name))
+    return unfinished, running
+
+
+def run(seeds, ticks, params, out, workers=None, retries=2):
+    '''
+    Plays an episode for every seed on a process pool, streaming the results to the archive out
+    with a ColumnWriter. If a worker process dies, the pool is restarted: the episodes that
+    were running are suspects and are replayed one at a time in their own worker, the rest
+    go back to the queue. A suspect that kills its worker more than retries times is recorded
+    as crashed. Returns the result rows.
+    '''
+    attempts = {}
+    todo = list(seeds)
+    suspects = []
+    writer = ColumnWriter(out)
+    write = writer.write
+    with tempfile.TemporaryDirectory() as marks:
+        while todo or suspects:
+            if todo:
+                todo, running = play(todo, ticks, params, workers, marks, write)
+                suspects += [seed for seed in todo if seed in running]
+                todo = [seed for seed in todo if seed not in running]
+            else:
+                seed = suspects.pop()
+                if play([seed], ticks, params, 1, marks, write)[0]:
+                    attempts[seed] = attempts.get(seed, 0) + 1
+                    if attempts[seed] > retries:
+                        write(failed(seed, 'crashed'))
+                    else:
+                        suspects.append(seed)
+    writer.close()
+    return writer.rows
+
+
+def aggregate(rows):
+    '''
+    Returns mean, standard deviation and quartiles of every numeric column over the finished episodes.
+    '''
+    ok = [row for row in rows if row['status'] == 'ok']
+    result = {'episodes': len(rows), 'finished': len(ok)}
+    if not ok:
+        return result
+    columns = {name: np.array([row[name] for row in ok], dtype=float) for name in FIELDS[2:]}
+    columns['hit_rate'] = columns['hits'] / np.maximum(columns['shots'], 1)
+    columns['kills_per_shot'] = columns['kills'] / np.maximum(columns['shots'], 1)
+    for name, values in columns.items():
+        result[name] = {'mean': float(values.mean()), 'std': float(values.std()),
+                        'min': float(values.min()), 'p25': float(np.percentile(values, 25)),
+                        'p50': float(np.percentile(values, 50)), 'p75': float(np.percentile(values, 75)),
+                        'max': float(values.max())}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--episodes', type=int, default=100)
+    parser.add_argument('--ticks', type=int, default=900, help='ticks per episode')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first episode')
+    parser.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    parser.add_argument('--out', default='results.npz')
+    parser.add_argument('--n-targets', type=int, default=3)
+    parser.add_argument('--refl-ort', type=float, help='shell rebounce coefficient across the wall')
+    parser.add_argument('--refl-par', type=float, help='shell rebounce coefficient along the wall')
+    parser.add_argument('--bomb-speed', type=int, nargs=2, metavar=('MIN', 'MAX'), help='speed range of the targets\' bombs')
+    parser.add_argument('--max-rad', type=int, help='radius of the targets at zero score')
+    parser.add_argument('--n-rects', type=int, help='rectangle targets per mission')
+    parser.add_argument('--rect-size', type=int, nargs=2, metavar=('W', 'H'), help='size of the rectangle targets')
+    parser.add_argument('--max-planes', type=int, help='largest plane wave')
+    parser.add_argument('--planes-step', type=int, help='score adding a plane to the waves')
+    args = parser.parse_args()
+
+    params = {'n_targets': args.n_targets}
+    for name in ('refl_ort', 'refl_par', 'bomb_speed') + DIFFICULTY:
+        value = getattr(args, name)
+        if value is not None:
+            params[name] = tuple(value) if isinstance(value, list) else value
+    seeds = range(args.seed, args.seed + args.episodes)
+    rows = run(seeds, args.ticks, params, args.out, args.workers)
+    print(json.dumps(aggregate(rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+'''
+Benchmark of the game loop. Builds scenarios of increasing size, steps a headless Manager
+for a fixed number of ticks and reports the time of every phase as JSON.
+
+    python benchmark.py --sizes 10 100 1000 --out bench.json
+    python benchmark.py --baseline bench.json
+    python benchmark.py --sizes --memory 100000 --out memory.json
+    python benchmark.py --sizes --memory 100000 --baseline memory.json
+'''
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pygame as pg
+import Cannon_with_module as game
+import assets
+import physics
+import planes
+import replay
+
+PHASES = ['handle_codes', 'move', 'collide', 'draw']
+
+# Factories of every entity class for the memory benchmark, called with a random generator
+# and the projectile stores.
+ENTITIES = {
+    'Shell': lambda rng, stores: game.m.Shell([rng.randint(20, 780), rng.randint(20, 580)],
+                                              [rng.randint(-30, 30), rng.randint(-30, 30)],
+                                              store=stores[0], rng=rng),
+    'Bombs': lambda rng, stores: game.m.Bombs([rng.randint(15, 785), rng.randint(15, 585)],
+                                              [rng.randint(-5, 5), rng.randint(-5, 5)], store=stores[1]),
+    'Bullet': lambda rng, stores: game.m.Bullet([rng.randint(0, 800), rng.randint(0, 600)], store=stores[1]),
+    'Cannon': lambda rng, stores: game.m.Cannon(coord=[30, rng.randint(30, 570)]),
+    'Rival_cannon': lambda rng, stores: game.m.Rival_cannon(coord=[770, rng.randint(30, 570)]),
+    'Target': lambda rng, stores: game.m.Target(rng=rng),
+    'MovingTargets': lambda rng, stores: game.m.MovingTargets(rng=rng),
+    'RectangleTarget': lambda rng, stores: game.m.RectangleTarget(40, 20, rng.randint(0, 760), rng.randint(0, 580)),
+}
+
+
+def build(size, seed=0):
+    '''
+    Returns a manager with size targets, shells, bombs, bullets, rectangle targets and a wave of size planes
+    on top of the usual ones.
+    '''
+    mgr = game.Manager(n_targets=3, seed=seed)
+    rng = mgr.rng
+    w, h = game.SCREEN_SIZE
+    for i in range(size):
+        cls = game.m.MovingTargets if i % 2 else game.m.Target
+        mgr.targets.append(cls(rad=rng.randint(5, 30), rng=rng))
+        mgr.balls.append(mgr.shell_pool.get([rng.randint(20, w - 20), rng.randint(20, h - 20)],
+                                            [rng.randint(-30, 30), rng.randint(-30, 30)]))
+        mgr.bombs.append(mgr.bomb_pool.get([rng.randint(15, w - 15), rng.randint(15, h - 15)],
+                                           [rng.randint(-5, 5), rng.randint(-5, 5)]))
+        mgr.bullets.append(mgr.bullet_pool.get([rng.randint(0, w), rng.randint(0, h)]))
+        mgr.rectangle_targets.append(mgr.rect_pool.get(rng.randint(10, 60), rng.randint(10, 40), rng.randint(0, w - 60),
+                                                       rng.randint(1, h - 41), rng.randint(1, 3)))
+    planes.wave(mgr.planes, rng, size, spacing=1)
+    return mgr
+
+
+def script(tick):
+    '''
+    Scripted input: charges the gun and fires every 5 ticks, aiming across the screen.
+    '''
+    codes = []
+    if tick % 5 == 0:
+        codes.append(replay.FIRE_DOWN)
+    if tick % 5 == 3:
+        codes.append(replay.FIRE_UP)
+    return codes, (400 + 300 * np.cos(tick / 20), 300 + 200 * np.sin(tick / 20))
+
+
+def timed(times, name, func):
+    '''
+    Returns func wrapped to append its duration to times[name].
+    '''
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        times[name].append(time.perf_counter() - start)
+        return result
+    return wrapper
+
+
+def stats(samples):
+    '''
+    Returns mean, median and 99th percentile of samples in milliseconds.
+    '''
+    ms = np.array(samples) * 1000
+    return {'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p99_ms': float(np.percentile(ms, 99))}
+
+
+def run(size, ticks, seed=0):
+    '''
+    Runs one scenario and returns its report.
+    '''
+    screen = pg.Surface(game.SCREEN_SIZE)
+    assets.circles.clear()
+    mgr = build(size, seed)
+    times = {name: [] for name in PHASES + ['tick']}
+    for name in PHASES:
+        setattr(mgr, name, timed(times, name, getattr(mgr, name)))
+    for tick in range(ticks):
+        start = time.perf_counter()
+        mgr.step(*script(tick))
+        mgr.draw(screen)
+        times['tick'].append(time.perf_counter() - start)
+    report = {'size': size, 'ticks': ticks,
+              'entities': len(mgr.balls) + len(mgr.bombs) + len(mgr.bullets) + len(mgr.targets)
+              + len(mgr.rectangle_targets) + len(mgr.planes),
+              'phases': {name: stats(samples) for name, samples in times.items()},
+              'circle_cache': assets.circles.stats()}
+
+    # Memory is measured in a second run, tracing slows the game down.
+    mgr = build(size, seed)
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    for tick in range(ticks):
+        mgr.step(*script(tick))
+        mgr.draw(screen)
+    report['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    report['blocks_per_tick'] = (sys.getallocatedblocks() - blocks) / ticks
+    return report
+
+
+def entity_memory(n, seed=0):
+    '''
+    Returns the bytes allocated per entity when n entities of every class are alive at once,
+    including their coordinate lists and their share of the projectile store arrays.
+    '''
+    result = {}
+    for name, factory in ENTITIES.items():
+        rng = random.Random(seed)
+        stores = [physics.ProjectileStore(game.SCREEN_SIZE) for i in range(2)]
+        factory(rng, stores)  # loads the class's images before measuring
+        tracemalloc.start()
+        entities = [factory(rng, stores) for i in range(n)]
+        result[name] = tracemalloc.get_traced_memory()[0] / n
+        tracemalloc.stop()
+        del entities
+    return result
+
+
+def compare(result, baseline, threshold):
+    '''
+    Returns descriptions of the phases whose median time and of the entity classes whose bytes per
+    entity grew by more than threshold over the baseline.
+    '''
+    old = {scenario['size']: scenario for scenario in baseline['scenarios']}
+    regressions = []
+    for scenario in result['scenarios']:
+        if scenario['size'] not in old:
+            continue
+        for name, phase in scenario['phases'].items():
+            before = old[scenario['size']]['phases'].get(name)
+            if before and phase['p50_ms'] > before['p50_ms'] * (1 + threshold):
+                regressions.append('size {} {}: {:.3f} ms -> {:.3f} ms'.format(
+                    scenario['size'], name, before['p50_ms'], phase['p50_ms']))
+    old_bytes = baseline.get('entity_bytes', {})
+    for name, size in result.get('entity_bytes', {}).items():
+        if name in old_bytes and size > old_bytes[name] * (1 + threshold):
+            regressions.append('{} bytes per entity: {:.0f} -> {:.0f}'.format(name, old_bytes[name], size))
+    return regressions
+
+
+def memory_changes(result, baseline):
+    '''
+    Returns lines with the bytes per entity of every class in the baseline and in the result.
+    '''
+    old_bytes = baseline.get('entity_bytes', {})
+    return ['{:<16}{:>8.0f} -> {:>8.0f} B'.format(name, old_bytes[name], size)
+            for name, size in result.get('entity_bytes', {}).items() if name in old_bytes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[0, 10, 100, 1000])
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='file to write the JSON report to, stdout by default')
+    parser.add_argument('--baseline', help='JSON report to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative growth of a phase time or of the bytes per entity')
+    parser.add_argument('--memory', type=int, metavar='N', help='also report bytes per entity with N entities of each class')
+    args = parser.parse_args()
+
+    result = {'scenarios': [run(size, args.ticks, args.seed) for size in args.sizes]}
+    if args.memory:
+        result['entity_bytes'] = entity_memory(args.memory, args.seed)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, 'w') as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        for line in memory_changes(result, baseline):
+            print(line, file=sys.stderr)
+        regressions = compare(result, baseline, args.threshold)
+        for line in regressions:
+            print('regression:', line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,8 @@
 import numpy as np
 import pygame as pg
+import assets
 from random import randint, gauss
 
-pg.init()
-pg.font.init()
-
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
@@ -12,6 +10,7 @@ RED = (255, 0, 0)
 SADDLE = (139,69,19)
 
 SCREEN_SIZE = (800, 600)
+FPS = 15
 
 
 def rand_color():
@@ -158,8 +157,7 @@ class Bullet(GameObject):
         self.coord = coord
         self.vel = vel
         self.rad = rad
-        self.bullet = pg.image.load('ball.png')
-        self.bullet = pg.transform.scale(self.bullet,(15,15))
+        self.bullet = assets.load_image('ball.png', (15, 15))
         self.count = 300
 
     def move(self):
@@ -278,8 +276,7 @@ class Plane(GameObject):
         self.position = randint(0,3) 
         coord = coord_set[self.position]
         self.coord = coord
-        self.plane = pg.image.load('plane.png')
-        self.plane = pg.transform.scale(self.plane,(30,30))
+        self.plane = assets.load_image('plane.png', (30, 30))
         self.rad = rad
     def move(self):
         '''
@@ -321,8 +318,7 @@ class Bombs(GameObject):
         self.color = color
         self.rad = rad
         self.is_alive = True
-        self.bomb = pg.image.load('bomb.png')
-        self.bomb = pg.transform.scale(self.bomb,(15,15))
+        self.bomb = assets.load_image('bomb.png', (15, 15))
     
     def check_corners(self, refl_ort=0.8, refl_par=0.9):
         '''
@@ -381,7 +377,7 @@ class ScoreTable:
     def __init__(self, t_destr=0, b_used=0,h_score = 0):
         self.t_destr = t_destr
         self.b_used = b_used
-        self.font = pg.font.SysFont("dejavusansmono", 25)
+        self.font = None
         self.h_score = h_score
 
     def score(self):
@@ -391,6 +387,9 @@ class ScoreTable:
         return self.t_destr - self.b_used - self.h_score
 
     def draw(self, screen):
+        if self.font is None:
+            pg.font.init()
+            self.font = pg.font.SysFont("dejavusansmono", 25)
         score_surf = []
         score_surf.append(self.font.render("Destroyed: {}".format(self.t_destr), True, WHITE))
         score_surf.append(self.font.render("Balls used: {}".format(self.b_used), True, WHITE))
@@ -429,19 +428,23 @@ class Manager:
                 30 - max(0, self.score_t.score()))))
 
 
-    def process(self, events, screen):
+    def process(self, events, screen=None, mouse_pos=None):
         '''
         Runs all necessary method for each iteration. Adds new targets, if previous are destroyed.
+        The gun aims at mouse_pos if it is given, otherwise at the real mouse. Nothing is drawn
+        if screen is None, so the manager can run without a display.
         '''
         done = self.handle_events(events)
 
-        if pg.mouse.get_focused():
+        if mouse_pos is None and pg.display.get_init() and pg.mouse.get_focused():
             mouse_pos = pg.mouse.get_pos()
+        if mouse_pos is not None:
             self.gun.set_angle(mouse_pos)
         
         self.move()
         self.collide()
-        self.draw(screen)
+        if screen is not None:
+            self.draw(screen)
 
         if len(self.targets) == 0 and len(self.balls) == 0:
             self.new_mission()
@@ -476,8 +479,12 @@ class Manager:
 
     def draw(self, screen):
         '''
-        Runs balls', gun's, targets' and score table's drawing method.
+        Runs bombs', bullets', balls', gun's, targets' and score table's drawing method.
         '''
+        for bomb in self.bombs:
+            bomb.draw(screen)
+        for bullet in self.bullets:
+            bullet.draw(screen)
         for ball in self.balls:
             ball.draw(screen)
         for target in self.targets:
@@ -502,10 +509,8 @@ class Manager:
         for i, target in enumerate(self.targets):
             target.move()
         for bomb in self.bombs:
-            bomb.draw(screen)
             bomb.move()
         for bullet in self.bullets:
-            bullet.draw(screen)
             bullet.move()
         self.rival.move(self.gun)
         
@@ -540,21 +545,27 @@ class Manager:
             self.score_t.h_score += 1
 
 
-screen = pg.display.set_mode(SCREEN_SIZE)
-pg.display.set_caption("The gun of Khiryanov")
+def main():
+    pg.init()
+    screen = pg.display.set_mode(SCREEN_SIZE)
+    pg.display.set_caption("The gun of Khiryanov")
+
+    done = False
+    clock = pg.time.Clock()
+
+    mgr = Manager(n_targets=3)
 
-done = False
-clock = pg.time.Clock()
+    while not done:
+        clock.tick(FPS)
+        screen.fill(BLACK)
 
-mgr = Manager(n_targets=3)
+        done = mgr.process(pg.event.get(), screen)
 
-while not done:
-    clock.tick(15)
-    screen.fill(BLACK)
+        pg.display.update()
 
-    done = mgr.process(pg.event.get(), screen)
 
-    pg.display.update()
+    pg.quit()
 
 
-pg.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
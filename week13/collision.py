@@ -0,0 +1,277 @@
+from collections import namedtuple
+import numpy as np
+
+Impacts = namedtuple('Impacts', ['a', 'b', 'toi'])
+CHUNK = 65536  # candidate pairs tested at once, bounds the size of the temporary arrays
+
+
+def chunked(kernel, ia, ib, chunk, *args):
+    '''
+    Runs the narrow phase kernel on the candidate pairs chunk pairs at a time and joins the impacts.
+    '''
+    parts = [kernel(*args, ia[k:k + chunk], ib[k:k + chunk], chunk=chunk) for k in range(0, len(ia), chunk)]
+    return Impacts(*[np.concatenate(part) for part in zip(*parts)])
+
+
+def swept_pairs(start_a, end_a, rad_a, start_b, end_b, rad_b, ia, ib, chunk=CHUNK):
+    '''
+    Continuous narrow phase for candidate pairs (ia[k], ib[k]). During the tick the circles of group a
+    move from start_a to end_a and the ones of group b from start_b to end_b with constant velocity.
+    A pair hits if the circles touch at any moment of the tick, so fast or small circles can't pass
+    through each other between two ticks. Returns the hitting pairs with the time of impact,
+    the fraction of the tick at which they first touch (0 if they touch at its start).
+    More than chunk pairs are tested in chunks.
+    '''
+    ia = np.asarray(ia, dtype=np.intp)
+    ib = np.asarray(ib, dtype=np.intp)
+    if len(ia) > chunk:
+        return chunked(swept_pairs, ia, ib, chunk, start_a, end_a, rad_a, start_b, end_b, rad_b)
+    start_a = np.asarray(start_a, dtype=float).reshape(-1, 2)
+    start_b = np.asarray(start_b, dtype=float).reshape(-1, 2)
+    delta = start_a[ia] - start_b[ib]
+    motion = (np.asarray(end_a, dtype=float).reshape(-1, 2) - start_a)[ia] \
+        - (np.asarray(end_b, dtype=float).reshape(-1, 2) - start_b)[ib]
+    min_dist = np.asarray(rad_a, dtype=float)[ia] + np.asarray(rad_b, dtype=float)[ib]
+    hit, toi = first_touch(delta, motion, min_dist)
+    return Impacts(ia[hit], ib[hit], toi[hit])
+
+
+def first_touch(delta, motion, min_dist):
+    '''
+    For points at delta moving by motion during the tick, returns whether they come within
+    min_dist of the origin during the tick and the fraction of the tick at which they first do.
+    '''
+    # The distance at time t is |delta + t*motion|, it equals min_dist where a*t**2 + 2*b*t + c = 0.
+    a = (motion**2).sum(axis=1)
+    b = (delta * motion).sum(axis=1)
+    c = (delta**2).sum(axis=1) - min_dist**2
+    disc = b**2 - a*c
+    moving = a > 0
+    t = np.full(len(a), np.inf)
+    t[moving] = (-b[moving] - np.sqrt(np.maximum(disc[moving], 0))) / a[moving]
+    touching = c <= 0
+    hit = touching | (moving & (disc >= 0) & (t >= 0) & (t <= 1))
+    return hit, np.where(touching, 0.0, t)
+
+
+def segment_box(start, motion, low, high):
+    '''
+    Slab test of points moving from start by motion during the tick against the boxes from low to high.
+    Returns whether they are inside the box at some moment of the tick and the fraction of the tick
+    at which they enter it.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (low - start) / motion
+        t2 = (high - start) / motion
+    still = motion == 0
+    inside = (start >= low) & (start <= high)
+    enter = np.where(still, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2)).max(axis=1)
+    leave = np.where(still, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2)).min(axis=1)
+    hit = (enter <= leave) & (leave >= 0) & (enter <= 1)
+    return hit, np.maximum(enter, 0)
+
+
+def swept_box_pairs(start, end, rad, box_start, box_end, ia, ib, chunk=CHUNK):
+    '''
+    Continuous narrow phase between circles moving from start to end and axis-aligned boxes given
+    as rows (left, top, right, bottom) moving from box_start to box_end, for candidate pairs
+    (ia[k], ib[k]). A circle touches a box when its center enters the box grown by the radius
+    with rounded corners, that is the box widened by the radius, the box heightened by the radius
+    or one of the circles of the radius around the corners. Returns the hitting pairs with the time of impact.
+    More than chunk pairs are tested in chunks.
+    '''
+    ia = np.asarray(ia, dtype=np.intp)
+    ib = np.asarray(ib, dtype=np.intp)
+    if len(ia) > chunk:
+        return chunked(swept_box_pairs, ia, ib, chunk, start, end, rad, box_start, box_end)
+    start = np.asarray(start, dtype=float).reshape(-1, 2)
+    box_start = np.asarray(box_start, dtype=float).reshape(-1, 4)
+    box = box_start[ib]
+    center = start[ia]
+    # Boxes are held still, the circles move relatively to them.
+    motion = (np.asarray(end, dtype=float).reshape(-1, 2) - start)[ia] \
+        - (np.asarray(box_end, dtype=float).reshape(-1, 4) - box_start)[ib, :2]
+    r = np.asarray(rad, dtype=float)[ia]
+    zero = np.zeros_like(r)
+    hit = np.zeros(len(ia), dtype=bool)
+    toi = np.full(len(ia), np.inf)
+    for grow_x, grow_y in ((r, zero), (zero, r)):
+        grow = np.stack([grow_x, grow_y], axis=1)
+        found, t = segment_box(center, motion, box[:, :2] - grow, box[:, 2:] + grow)
+        hit |= found
+        toi = np.where(found, np.minimum(toi, t), toi)
+    for corner in ((0, 1), (2, 1), (0, 3), (2, 3)):
+        found, t = first_touch(center - box[:, corner], motion, r)
+        hit |= found
+        toi = np.where(found, np.minimum(toi, t), toi)
+    return Impacts(ia[hit], ib[hit], toi[hit])
+
+
+def box_pairs(box_a, box_b):
+    '''
+    Broad phase between two groups of axis-aligned boxes given as rows (left, top, right, bottom).
+    The boxes of b are sorted by their left edge, for every box of a the ones starting between its
+    left edge minus the widest box of b and its right edge are found by binary search, then the
+    pairs not overlapping on both axes are dropped. Returns the candidate pairs (ia, ib).
+    '''
+    box_a = np.asarray(box_a, dtype=float).reshape(-1, 4)
+    box_b = np.asarray(box_b, dtype=float).reshape(-1, 4)
+    order = np.argsort(box_b[:, 0], kind='stable')
+    left = box_b[order, 0]
+    width = (box_b[:, 2] - box_b[:, 0]).max(initial=0)
+    first = np.searchsorted(left, box_a[:, 0] - width, side='left')
+    count = np.maximum(np.searchsorted(left, box_a[:, 2], side='right') - first, 0)
+    ia = np.repeat(np.arange(len(box_a)), count)
+    ib = order[np.repeat(first, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)]
+    a, b = box_a[ia], box_b[ib]
+    near = (a[:, 0] <= b[:, 2]) & (b[:, 0] <= a[:, 2]) & (a[:, 1] <= b[:, 3]) & (b[:, 1] <= a[:, 3])
+    return ia[near], ib[near]
+
+
+def swept_bounds(start, end, rad):
+    '''
+    Returns the centers and radii of the circles bounding circles moving from start to end.
+    '''
+    start = np.asarray(start, dtype=float).reshape(-1, 2)
+    end = np.asarray(end, dtype=float).reshape(-1, 2)
+    half = (end - start) / 2
+    return start + half, np.asarray(rad, dtype=float) + np.hypot(half[:, 0], half[:, 1])
+
+
+def sweep_pairs(pos, rad):
+    '''
+    Sort and sweep broad phase on the x axis. The circles are sorted by the left edge of their
+    bounding box, each one is paired with the following ones starting before its right edge,
+    and the pairs whose boxes don't overlap on y are dropped. Returns the candidate pairs (ia, ib), ia < ib.
+    '''
+    pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+    rad = np.asarray(rad, dtype=float)
+    n = len(rad)
+    order = np.argsort(pos[:, 0] - rad, kind='stable')
+    left = (pos[:, 0] - rad)[order]
+    right = (pos[:, 0] + rad)[order]
+    count = np.searchsorted(left, right, side='right') - np.arange(1, n + 1)
+    first = np.repeat(np.arange(n), count)
+    second = first + 1 + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    a, b = order[first], order[second]
+    near = np.abs(pos[a, 1] - pos[b, 1]) <= rad[a] + rad[b]
+    a, b = a[near], b[near]
+    return np.minimum(a, b), np.maximum(a, b)
+
+
+def resolve_elastic(pos, vel, rad, inv_mass, ia, ib):
+    '''
+    Resolves the contacts among the candidate pairs (ia, ib) as absolutely elastic collisions of
+    rigid circles. Overlapping circles are pushed apart and approaching ones exchange momentum
+    along the line of their centers; a circle with inv_mass 0 is immovable. pos and vel are
+    float arrays changed in place. Returns the indices of the moved circles.
+    '''
+    ia = np.asarray(ia, dtype=np.intp)
+    ib = np.asarray(ib, dtype=np.intp)
+    delta = pos[ib] - pos[ia]
+    dist = np.hypot(delta[:, 0], delta[:, 1])
+    min_dist = rad[ia] + rad[ib]
+    weight = inv_mass[ia] + inv_mass[ib]
+    hit = (dist < min_dist) & (weight > 0)
+    ia, ib, delta, dist, min_dist, weight = ia[hit], ib[hit], delta[hit], dist[hit], min_dist[hit], weight[hit]
+    # Circles at the same center are separated along x.
+    normal = np.where(dist[:, None] > 0, delta / np.where(dist > 0, dist, 1)[:, None], [1.0, 0.0])
+
+    push = ((min_dist - dist) / weight)[:, None] * normal
+    np.add.at(pos, ia, -push * inv_mass[ia, None])
+    np.add.at(pos, ib, push * inv_mass[ib, None])
+
+    approach = ((vel[ia] - vel[ib]) * normal).sum(axis=1)
+    impulse = (np.where(approach > 0, 2 * approach / weight, 0))[:, None] * normal
+    np.add.at(vel, ia, -impulse * inv_mass[ia, None])
+    np.add.at(vel, ib, impulse * inv_mass[ib, None])
+    moved = np.r_[ia[inv_mass[ia] > 0], ib[inv_mass[ib] > 0]]
+    return np.unique(moved)
+
+
+def circles(objects):
+    '''
+    Returns arrays of centers and radii of objects with coord and rad.
+    '''
+    pos = np.array([obj.coord for obj in objects], dtype=float).reshape(-1, 2)
+    rad = np.array([obj.rad for obj in objects], dtype=float)
+    return pos, rad
+
+
+def boxes(objects):
+    '''
+    Returns arrays of the previous and the current boxes (left, top, right, bottom) of objects with rect.
+    '''
+    end = np.array([obj.rect.topleft + obj.rect.bottomright for obj in objects], dtype=float).reshape(-1, 4)
+    start = np.array([obj.lerp(0.0) for obj in objects], dtype=float).reshape(-1, 2)
+    start = np.c_[start, start + end[:, 2:] - end[:, :2]]
+    return start, end
+
+
+def paths(objects):
+    '''
+    Returns arrays of the previous and the current centers and the radii of game objects.
+    Objects that don't remember their previous coordinate stand still.
+    '''
+    start = np.array([obj.lerp(0.0) for obj in objects], dtype=float).reshape(-1, 2)
+    end, rad = circles(objects)
+    return start, end, rad
+
+
+class SpatialHash:
+    '''
+    Uniform grid spatial hash. Keeps the keys of circles sorted by the cells their bounding box
+    covers, so only the circles from nearby cells have to be checked for collision. The grid is
+    built and queried with array operations, the circles of a cell are found by binary search.
+    '''
+    def __init__(self, cell_size):
+        '''
+        Constructor method. Sets the size of a grid cell.
+        '''
+        self.cell_size = cell_size
+        self.cells = np.zeros(0, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.intp)
+
+    @classmethod
+    def from_circles(cls, pos, rad, cell_size=None):
+        '''
+        Builds a hash of the circles given by arrays pos and rad, keyed by their index.
+        The cell size defaults to the largest diameter.
+        '''
+        if cell_size is None:
+            cell_size = 2 * np.max(rad, initial=0)
+        grid = cls(max(cell_size, 1))
+        keys, cells = grid.cover(pos, rad)
+        order = np.argsort(cells, kind='stable')
+        grid.cells, grid.keys = cells[order], keys[order]
+        return grid
+
+    def cover(self, pos, rad):
+        '''
+        Returns the pairs (i, cell) of circles i given by pos and rad and the cells their bounding box covers.
+        A cell (column, row) is numbered column * 2**32 + row.
+        '''
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        rad = np.asarray(rad, dtype=float).reshape(-1, 1)
+        low = np.floor((pos - rad) / self.cell_size).astype(np.int64)
+        span = np.floor((pos + rad) / self.cell_size).astype(np.int64) - low + 1
+        count = span[:, 0] * span[:, 1]
+        owner = np.repeat(np.arange(len(pos)), count)
+        k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        rows = span[owner, 1]
+        return owner, (low[owner, 0] + k // rows) * 2**32 + low[owner, 1] + k % rows
+
+    def pairs(self, pos, rad):
+        '''
+        Returns the candidate pairs (i, key) of circles i given by pos and rad and the keys sharing a cell
+        with them, sorted by i and key.
+        '''
+        owner, cells = self.cover(pos, rad)
+        first = np.searchsorted(self.cells, cells, side='left')
+        count = np.searchsorted(self.cells, cells, side='right') - first
+        ia = np.repeat(owner, count)
+        ib = self.keys[np.repeat(first, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)]
+        # A pair sharing several cells is found once for each of them.
+        n = max(len(self.keys), 1)
+        pair = np.unique(ia * n + ib)
+        return pair // n, pair % n
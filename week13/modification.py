@@ -1,6 +1,10 @@
+import math
 import pygame as pg
 import numpy as np
-from random import randint
+from functools import lru_cache
+import assets
+import physics
+import random
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -8,72 +12,182 @@ RED = (255, 0, 0)
 GRAY = (220,220,220)
 PINK = (220,0,0)
 TEAL= (0,255,255)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+GREEN = (0, 255, 0)
+MAGENTA = (255, 0, 255)
+CYAN = (0, 255, 255)
+COLORS = [RED, BLUE, YELLOW, GREEN, MAGENTA, CYAN]
 
 SCREEN_SIZE = (800, 600)
 
-def rand_color():
-    return (randint(0, 255), randint(0, 255), randint(0, 255))
+# Teams of projectiles: the player's ones hit targets, the enemy's ones hit the player's gun.
+PLAYER, ENEMY = 0, 1
+
+def rand_color(rng=random):
+    return (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))
+
+@lru_cache(maxsize=4096)
+def barrel_offsets(angle, length, width=5):
+    '''
+    Returns the four corners of a gun barrel pointing at angle, relative to the gun's position.
+    Cached, so the trigonometry runs only for new angles and lengths.
+    '''
+    x1, y1 = int(width * math.cos(angle - math.pi/2)), int(width * math.sin(angle - math.pi/2))
+    x2, y2 = int(length * math.cos(angle)), int(length * math.sin(angle))
+    return ((x1, y1), (x1 + x2, y1 + y2), (x2 - x1, y2 - y1), (-x1, -y1))
+
+def barrel_shape(coord, angle, length):
+    '''
+    Returns the barrel polygon of a gun at coord.
+    '''
+    x, y = coord
+    return [(x + dx, y + dy) for dx, dy in barrel_offsets(angle, length)]
 
 class GameObject:
+    '''
+    Base class of the game objects. Every subclass lists its attributes in __slots__,
+    so instances carry no __dict__.
+    '''
+    __slots__ = ()
 
     def move(self):
         pass
     
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         pass  
 
+    def release(self):
+        pass
+
+    def lerp(self, alpha=1.0):
+        '''
+        Returns the coordinate interpolated between the previous and the current tick.
+        Objects that don't remember their previous coordinate are drawn where they are.
+        '''
+        prev = getattr(self, 'prev', None)
+        if prev is None or alpha >= 1:
+            return self.coord
+        return [p + (c - p) * alpha for p, c in zip(prev, self.coord)]
+
+    def sprite(self, alpha=1.0):
+        '''
+        Returns the surface and the position to blit it at, for batched drawing with Surface.blits.
+        '''
+        return self.sprite_at(*self.lerp(alpha))
+
+    def sprite_at(self, x, y):
+        pass
+
+    def circle_at(self, x, y):
+        '''
+        The sprite of objects drawn as a circle of their color and radius centered at (x, y).
+        '''
+        rad = int(self.rad)
+        return assets.circle(rad, self.color), (int(x) - rad, int(y) - rad)
+
+def store_sprites(objects, store, alpha=1.0):
+    '''
+    Returns the sprites of objects whose state lives in store, interpolating all positions at once.
+    '''
+    if not objects:
+        return []
+    pos = store.lerp([obj.slot for obj in objects], alpha)
+    return [obj.sprite_at(x, y) for obj, (x, y) in zip(objects, pos.tolist())]
+
+class Pool:
+    '''
+    Object pool. Keeps dead objects of one class and reinitializes them instead of creating new ones.
+    '''
+    def __init__(self, cls, size=256, **kwargs):
+        '''
+        Constructor method. Sets the pooled class and the maximum number of kept free objects.
+        '''
+        self.cls = cls
+        self.size = size
+        self.kwargs = kwargs
+        self.free = []
+
+    def get(self, *args, **kwargs):
+        '''
+        Returns a recycled object if there is one, otherwise a new one.
+        Keyword arguments given to the pool constructor are passed to every object.
+        '''
+        kwargs = {**self.kwargs, **kwargs}
+        if self.free:
+            obj = self.free.pop()
+            obj.__init__(*args, **kwargs)
+            return obj
+        return self.cls(*args, **kwargs)
+
+    def put(self, obj):
+        '''
+        Takes a dead object back. Objects above the pool size are left to the garbage collector.
+        '''
+        obj.release()
+        if len(self.free) < self.size:
+            self.free.append(obj)
+
 class Shell(GameObject):
     '''
     The ball class. Creates a ball, controls it's movement and implement it's rendering.
+    The ball's state lives in a ProjectileStore, the object is a view of one slot of it.
     '''
-    def __init__(self, coord, vel, rad=20, color=None):
+    __slots__ = ('store', 'slot', 'color')
+    default_store = physics.ProjectileStore(SCREEN_SIZE)
+    coord = physics.StoreField('pos')
+    vel = physics.StoreField('vel')
+    rad = physics.StoreField('rad')
+    is_alive = physics.StoreField('alive')
+    prev = physics.StoreField('prev')
+
+    def __init__(self, coord, vel, rad=20, color=None, store=None, rng=random, grav=0, refl=None):
         '''
         Constructor method. Initializes ball's parameters and initial values.
+        grav is the ball's own gravity, applied by every step of the store, refl its pair of
+        rebounce coefficients, the store's ones by default.
         '''
-        self.coord = coord
-        self.vel = vel
+        self.store = self.default_store if store is None else store
+        self.slot = self.store.add(coord, vel, rad, grav=grav, team=PLAYER, refl=refl)
         if color == None:
-            color = rand_color()
+            color = rand_color(rng)
         self.color = color
-        self.rad = rad
-        self.is_alive = True
+
+    def release(self):
+        '''
+        Frees the ball's slot in the store.
+        '''
+        self.store.remove(self.slot)
 
     def check_corners(self, refl_ort=0.8, refl_par=0.9):
         '''
         Reflects ball's velocity when ball bumps into the screen corners. Implemetns inelastic rebounce.
         '''
-        for i in range(2):
-            if self.coord[i] < self.rad:
-                self.coord[i] = self.rad
-                self.vel[i] = -int(self.vel[i] * refl_ort)
-                self.vel[1-i] = int(self.vel[1-i] * refl_par)
-            elif self.coord[i] > SCREEN_SIZE[i] - self.rad:
-                self.coord[i] = SCREEN_SIZE[i] - self.rad
-                self.vel[i] = -int(self.vel[i] * refl_ort)
-                self.vel[1-i] = int(self.vel[1-i] * refl_par)
+        self.store.check_corners([self.slot], refl_ort, refl_par)
 
     def move(self, time=1, grav=0):
         '''
         Moves the ball according to it's velocity and time step.
         Changes the ball's velocity due to gravitational force.
         '''
-        self.vel[1] += grav
-        for i in range(2):
-            self.coord[i] += time * self.vel[i]
-        self.check_corners()
-        if self.vel[0]**2 + self.vel[1]**2 < 2**2 and self.coord[1] > SCREEN_SIZE[1] - 2*self.rad:
-            self.is_alive = False
+        self.store.step(time, grav, [self.slot])
+
+    sprite_at = GameObject.circle_at
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         '''
-        Draws the ball on appropriate surface.
+        Draws the ball on appropriate surface. Returns the drawn rect.
         '''
-        pg.draw.circle(screen, self.color, self.coord, self.rad)
+        return screen.blit(*self.sprite(alpha))
 
 class Cannon(GameObject):
     '''
     Cannon class. Manages it's renderring, movement and striking.
     '''
+    __slots__ = ('coord', 'angle', 'max_pow', 'min_pow', 'body_color', 'gun_color', 'active', 'pow')
+    body_rect = pg.Rect(-20, -10, 40, 20)
+    wheel_offsets = ((-15, 10), (0, 10), (15, 10))
+    wheel_radius = 8
     def __init__(self, coord=[30, SCREEN_SIZE[1]//2], angle=0, max_pow=50, 
                  min_pow=10,  body_color=GRAY, gun_color=TEAL):
         '''
@@ -101,13 +215,14 @@ class Cannon(GameObject):
         if self.active and self.pow < self.max_pow:
             self.pow += inc
 
-    def strike(self):
+    def strike(self, pool=None):
         '''
         Creates ball, according to gun's direction and current charge power.
+        Takes the ball from pool, if it is given.
         '''
         vel = self.pow
         angle = self.angle
-        ball = Shell(list(self.coord), [int(vel * np.cos(angle)), int(vel * np.sin(angle))])
+        ball = (pool.get if pool else Shell)(list(self.coord), [int(vel * np.cos(angle)), int(vel * np.sin(angle))])
         self.pow = self.min_pow
         self.active = False
         return ball
@@ -128,62 +243,70 @@ class Cannon(GameObject):
         if (self.coord[0] > 30 or inc_x > 0) and (self.coord[0] < SCREEN_SIZE[0] - 30 or inc_x < 0):
             self.coord[0] += inc_x
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         '''
-        Draws the tank on the screen.
+        Draws the tank on the screen. Returns the drawn rect.
         '''
-        tank_body = pg.Rect(self.coord[0] - 20, self.coord[1] - 10, 40, 20)
-        pg.draw.rect(screen, self.body_color, tank_body)
-
-        gun_shape = []
-        vec_1 = np.array([int(5 * np.cos(self.angle - np.pi/2)), int(5 * np.sin(self.angle - np.pi/2))])
-        vec_2 = np.array([int(self.pow * np.cos(self.angle)), int(self.pow * np.sin(self.angle))])
-        gun_pos = np.array(self.coord)
-        gun_shape.append((gun_pos + vec_1).tolist())
-        gun_shape.append((gun_pos + vec_1 + vec_2).tolist())
-        gun_shape.append((gun_pos + vec_2 - vec_1).tolist())
-        gun_shape.append((gun_pos - vec_1).tolist())
-        wheel_radius = 8 
-        wheel_1 = pg.draw.circle(screen, self.body_color, (self.coord[0] - 15, self.coord[1] + 10), wheel_radius)
-        wheel_2 = pg.draw.circle(screen, self.body_color, (self.coord[0], self.coord[1] + 10), wheel_radius)
-        wheel_3 = pg.draw.circle(screen, self.body_color, (self.coord[0] + 15, self.coord[1] + 10), wheel_radius)
-        pg.draw.polygon(screen, self.gun_color, gun_shape)
+        x, y = self.coord
+        tank_body = pg.draw.rect(screen, self.body_color, self.body_rect.move(x, y))
+        wheels = [pg.draw.circle(screen, self.body_color, (x + dx, y + dy), self.wheel_radius)
+                  for dx, dy in self.wheel_offsets]
+        gun = pg.draw.polygon(screen, self.gun_color, barrel_shape(self.coord, self.angle, self.pow))
+        return tank_body.unionall(wheels + [gun])
 
     def check_collision(self, bomb):
         '''
         Checks whether the bomb bumps into cannon.
         '''
-        dist = sum([(self.coord[i] - bomb.coord[i])**2 for i in range(2)])**0.5
+        dist2 = (self.coord[0] - bomb.coord[0])**2 + (self.coord[1] - bomb.coord[1])**2
         #min_dist = self.rad + bomb.rad
-        return dist <= bomb.rad
+        return dist2 <= bomb.rad**2
     
 
 class Bullet(GameObject):
     '''
     rival cannon's bullet. Manages it's renderring, movement.
+    The bullet's state lives in a ProjectileStore, the object is a view of one slot of it.
     '''
-    def __init__(self, coord, vel = 20, rad = 15):
+    __slots__ = ('store', 'slot')
+    default_store = physics.ProjectileStore(SCREEN_SIZE)
+    bullet = assets.Image('ball.png', (15, 15))
+    coord = physics.StoreField('pos')
+    vel = physics.StoreField('vel')
+    rad = physics.StoreField('rad')
+    count = physics.StoreField('count')
+    is_alive = physics.StoreField('alive')
+    prev = physics.StoreField('prev')
+
+    def __init__(self, coord, vel = 20, rad = 15, store=None):
         '''
-        constructor method, load bullet image and its radius, velocity.
+        constructor method, sets bullet's radius and velocity towards the left.
         '''
-        self.coord = coord
-        self.vel = vel
-        self.rad = rad
-        self.bullet = pg.image.load('ball.png')
-        self.bullet = pg.transform.scale(self.bullet,(15,15))
-        self.count = 300
+        self.store = self.default_store if store is None else store
+        self.slot = self.store.add(coord, (-vel, 0), rad, count=300, team=ENEMY, bounce=False)
+
+    def release(self):
+        '''
+        Frees the bullet's slot in the store.
+        '''
+        self.store.remove(self.slot)
 
     def move(self):
         '''
         move method for bullet, move horizontally towards user cannon.
+        the bullet dies when it leaves the screen or its count runs out.
         '''
-        self.coord[0] -= self.vel
-            
-    def draw(self, screen):
+        self.store.step(idx=[self.slot])
+
+
+    def sprite_at(self, x, y):
+        return self.bullet, (x, y)
+
+    def draw(self, screen, alpha=1.0):
         '''
-        draw the bullet
+        draw the bullet, return the drawn rect
         '''
-        screen.blit(self.bullet, self.coord)
+        return screen.blit(*self.sprite(alpha))
 
 
 class Rival_cannon(GameObject):
@@ -191,6 +314,8 @@ class Rival_cannon(GameObject):
     Rival_cannon class. Manages it's renderring, movement and striking. This is the rival cannon.
     that attacks the user
     '''
+    __slots__ = ('coord', 'angle', 'max_pow', 'min_pow', 'color', 'active', 'pow', 'prev')
+
     def __init__(self, coord=[770, SCREEN_SIZE[1]//2], angle=30, max_pow=50, min_pow=10, color=WHITE):
         '''
         Constructor method. Sets coordinate, direction, minimum and maximum power and color of the gun.
@@ -202,120 +327,122 @@ class Rival_cannon(GameObject):
         self.color = color
         self.active = False
         self.pow = min_pow
+        self.prev = None
 
     def move(self, cannon):
         '''
         move towards user cannon
         '''
+        self.prev = list(self.coord)
         if(cannon.coord[1] != self.coord[1]):
             if(cannon.coord[1] > self.coord[1]):
                 self.coord[1] += 3
             else:
                 self.coord[1] -= 3
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         '''
-        draw a rival cannon on the oposite side of our user cannon
+        draw a rival cannon on the oposite side of our user cannon, return the drawn rect
         '''
-        gun_shape = []
-        vec_1 = np.array([int(5*np.cos(self.angle - np.pi/2)), int(5*np.sin(self.angle - np.pi/2))])
-        vec_2 = np.array([int(self.pow*np.cos(self.angle)), int(self.pow*np.sin(self.angle))])
-        gun_pos = np.array(self.coord)
-        gun_shape.append((gun_pos + vec_1).tolist())
-        gun_shape.append((gun_pos + vec_1 + vec_2).tolist())
-        gun_shape.append((gun_pos + vec_2 - vec_1).tolist())
-        gun_shape.append((gun_pos - vec_1).tolist())
-        pg.draw.polygon(screen, self.color, gun_shape)
+        return pg.draw.polygon(screen, self.color, barrel_shape(self.lerp(alpha), self.angle, self.pow))
 
-    def strike(self):
+    def strike(self, pool=None):
         '''
         strike method, let rival cannon shoot a bullet 
-        return object bullet
+        return object bullet, taken from pool if it is given
         '''
-        bullet = Bullet(list(self.coord))
+        bullet = (pool.get if pool else Bullet)(list(self.coord))
         return bullet
 
 class Bombs(GameObject):
     '''
     Bomb class. Creates a bomb from rival or target manages it's rendering and collision with a cannon event.
+    The bomb's state lives in a ProjectileStore, the object is a view of one slot of it.
     '''
-
-    def __init__(self, coord, vel, rad=15, color=WHITE):
+    __slots__ = ('store', 'slot', 'color')
+    default_store = physics.ProjectileStore(SCREEN_SIZE)
+    bomb = assets.Image('bomb.png', (15, 15))
+    coord = physics.StoreField('pos')
+    vel = physics.StoreField('vel')
+    rad = physics.StoreField('rad')
+    count = physics.StoreField('count')
+    is_alive = physics.StoreField('alive')
+    prev = physics.StoreField('prev')
+
+    def __init__(self, coord, vel, rad=15, color=WHITE, store=None):
         '''
         Constructor method. Initializes ball's parameters and initial values.
         '''
-        self.coord = coord
-        self.vel = vel
+        self.store = self.default_store if store is None else store
+        self.slot = self.store.add(coord, vel, rad, count=300, team=ENEMY)
         self.color = color
-        self.rad = rad
-        self.is_alive = True
-        self.bomb = pg.image.load('bomb.png')
-        self.bomb = pg.transform.scale(self.bomb,(15,15))
+
+    def release(self):
+        '''
+        Frees the bomb's slot in the store.
+        '''
+        self.store.remove(self.slot)
     
     def check_corners(self, refl_ort=0.8, refl_par=0.9):
         '''
         Reflects bombs' velocity when bomb bumps into the screen corners. Implemetns inelastic rebounce.
         '''
-        for i in range(2):
-            if self.coord[i] < self.rad:
-                self.coord[i] = self.rad
-                self.vel[i] = -int(self.vel[i] * refl_ort)
-                self.vel[1-i] = int(self.vel[1-i] * refl_par)
-            elif self.coord[i] > SCREEN_SIZE[i] - self.rad:
-                self.coord[i] = SCREEN_SIZE[i] - self.rad
-                self.vel[i] = -int(self.vel[i] * refl_ort)
-             
+        self.store.check_corners([self.slot], refl_ort, refl_par)
 
     def move(self, time=1, grav=0):
         '''
         Moves the ball according to it's velocity and time step.
         Changes the ball's velocity due to gravitational force.
         '''
-        self.vel[1] += grav
-        for i in range(2):
-            self.coord[i] += time * self.vel[i]
-        self.check_corners()
-        if self.vel[0]**2 + self.vel[1]**2 < 2**2 and self.coord[1] > SCREEN_SIZE[1] - 2*self.rad:
-            self.is_alive = False
-        #screen.blit(self.bomb, self.coord)
+        self.store.step(time, grav, [self.slot])
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         '''
-        Draws the bomb on appropriate surface.
+        Draws the bomb on appropriate surface. Returns the drawn rect.
         '''
         #pg.draw.circle(screen, self.color, self.coord, self.rad)
-        screen.blit(self.bomb, self.coord)
+        return screen.blit(*self.sprite(alpha))
+
+    def sprite_at(self, x, y):
+        return self.bomb, (x, y)
 
 class Target(GameObject):
     '''
     Target class. Creates target, manages it's rendering and collision with a ball event.
     '''
-    def __init__(self, coord=None, color=None, rad=30):
+    __slots__ = ('coord', 'rad', 'rng', 'color', 'bomb_speed')
+
+    def __init__(self, coord=None, color=None, rad=30, rng=random, bomb_speed=(1, 5)):
         '''
-        Constructor method. Sets coordinate, color and radius of the target.
+        Constructor method. Sets coordinate, color and radius of the target, the random
+        generator used for its bombs and the range of their speeds.
         '''
         if coord == None:
-            coord = [randint(rad, SCREEN_SIZE[0] - rad), randint(rad, SCREEN_SIZE[1] - rad)]
+            coord = [rng.randint(rad, SCREEN_SIZE[0] - rad), rng.randint(rad, SCREEN_SIZE[1] - rad)]
         self.coord = coord
         self.rad = rad
+        self.rng = rng
+        self.bomb_speed = bomb_speed
 
         if color == None:
-            color = rand_color()
+            color = rand_color(rng)
         self.color = color
 
     def check_collision(self, ball):
         '''
         Checks whether the ball bumps into target.
         '''
-        dist = sum([(self.coord[i] - ball.coord[i])**2 for i in range(2)])**0.5
+        dist2 = (self.coord[0] - ball.coord[0])**2 + (self.coord[1] - ball.coord[1])**2
         min_dist = self.rad + ball.rad
-        return dist <= min_dist
+        return dist2 <= min_dist**2
+
+    sprite_at = GameObject.circle_at
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         '''
-        Draws the target on the screen
+        Draws the target on the screen. Returns the drawn rect.
         '''
-        pg.draw.circle(screen, self.color, self.coord, self.rad)
+        return screen.blit(*self.sprite(alpha))
 
     def move(self):
         """
@@ -325,22 +452,37 @@ class Target(GameObject):
         pass
         
 
-    def strike(self):
+    def strike(self, pool=None):
         '''
-        Creates ball, according to gun's direction and current charge power.
+        Creates bomb with random direction and speed. Takes the bomb from pool, if it is given.
         '''
-        vel = randint(1,5)
-        angle = randint(0,360)
-        bomb = Bombs(list(self.coord), [int(vel * np.cos(angle)), int(vel * np.sin(angle))])
+        vel = self.rng.randint(*self.bomb_speed)
+        angle = self.rng.randint(0,360)
+        bomb = (pool.get if pool else Bombs)(list(self.coord), [int(vel * np.cos(angle)), int(vel * np.sin(angle))])
         return bomb
     
-class RectangleTarget:
-    def __init__(self, width, height, x, y, speed=1):
+class RectangleTarget(GameObject):
+    '''
+    Rectangle target moving up and down. Manages it's rendering and collision with a ball event.
+    '''
+    __slots__ = ('rect', 'speed', 'direction', 'prev', 'color')
+
+    def __init__(self, width, height, x, y, speed=1, color=RED):
         self.rect = pg.Rect(x, y, width, height)
         self.speed = speed
         self.direction = 1
+        self.prev = None
+        self.color = color
+
+    @property
+    def coord(self):
+        '''
+        The top left corner of the rectangle.
+        '''
+        return self.rect.topleft
 
     def move(self):
+        self.prev = self.rect.topleft
         # Move the rectangle vertically
         self.rect.y += self.speed * self.direction
 
@@ -348,61 +490,43 @@ class RectangleTarget:
         if self.rect.y <= 0 or self.rect.y >= SCREEN_SIZE[1] - self.rect.height:
             self.direction *= -1
 
-    def draw(self, screen):
-        pg.draw.rect(screen, (255, 0, 0), self.rect)
+    def draw(self, screen, alpha=1.0):
+        '''
+        Draws the target on the screen. Returns the drawn rect.
+        '''
+        return pg.draw.rect(screen, self.color, (self.lerp(alpha), self.rect.size))
 
     def check_collision(self, ball):
-        return self.rect.colliderect(ball.rect)
-    
-
-
-class Plane(GameObject):
-    '''
-    Create target that move very fast from diagonal
-    '''
-    def __init__(self, coord, rad = 30):
-        '''
-        Constructor method. Sets coordinate of the target.
         '''
-        coord_set = [ [ 0, 0], [ 800, 0], [ 0, 600], [ 800, 600] ]
-        self.position = randint(0,3) 
-        coord = coord_set[self.position]
-        self.coord = coord
-        self.plane = pg.image.load('plane.png')
-        self.plane = pg.transform.scale(self.plane,(30,30))
-        self.rad = rad
-    def move(self):
+        Checks whether the ball bumps into target: the point of the rectangle nearest to the
+        ball's center must be within its radius.
         '''
-        Move the target plane from diagonal
-        '''
-        if(self.position == 0):
-            if(self.coord[0] <= 800 and self.coord[1] <= 600):
-                self.coord[0] += 10
-                self.coord[1] = self.coord[0] * 0.75
-        elif(self.position == 1):
-            if(self.coord[0] >=0 and self.coord[1] <= 600):
-                self.coord[0] -= 10
-                self.coord[1] = -self.coord[0] * 0.75 + 600
-        elif(self.position == 2):
-            if(self.coord[0] <= 800 and self.coord[1] >= 0 ):
-                self.coord[0] += 10
-                self.coord[1] = -self.coord[0] * 0.75 + 600
-        else:
-            if(self.coord[0] >= 0  and self.coord[1] >= 0):
-                self.coord[0] -= 10
-                self.coord[1] =  self.coord[0] * 0.75
-    def draw(self, screen):
-        '''
-        Draw a target plane from one corner of the screen
-        '''
-        screen.blit(self.plane, self.coord)   
+        x = min(max(ball.coord[0], self.rect.left), self.rect.right)
+        y = min(max(ball.coord[1], self.rect.top), self.rect.bottom)
+        return (ball.coord[0] - x)**2 + (ball.coord[1] - y)**2 <= ball.rad**2
+
 
 class MovingTargets(Target):
-    def __init__(self, coord=None, color=None, rad=30):
-        super().__init__(coord, color, rad)
-        self.vx = randint(-2, +2)
-        self.vy = randint(-2, +2)
+    __slots__ = ('vx', 'vy', 'prev')
+
+    def __init__(self, coord=None, color=None, rad=30, rng=random, bomb_speed=(1, 5)):
+        super().__init__(coord, color, rad, rng, bomb_speed)
+        self.vx = rng.randint(-2, +2)
+        self.vy = rng.randint(-2, +2)
+        self.prev = None
     
     def move(self):
+        '''
+        Moves the target by its velocity. It bounces off the screen edges elastically.
+        '''
+        self.prev = list(self.coord)
         self.coord[0] += self.vx
-        self.coord[1] += self.vy
\ No newline at end of file
+        self.coord[1] += self.vy
+        if self.coord[0] < self.rad:
+            self.coord[0], self.vx = self.rad, abs(self.vx)
+        elif self.coord[0] > SCREEN_SIZE[0] - self.rad:
+            self.coord[0], self.vx = SCREEN_SIZE[0] - self.rad, -abs(self.vx)
+        if self.coord[1] < self.rad:
+            self.coord[1], self.vy = self.rad, abs(self.vy)
+        elif self.coord[1] > SCREEN_SIZE[1] - self.rad:
+            self.coord[1], self.vy = SCREEN_SIZE[1] - self.rad, -abs(self.vy)
\ No newline at end of file
@@ -0,0 +1,176 @@
+import numpy as np
+
+
+class ProjectileStore:
+    '''
+    Structure of arrays holding the state of many projectiles. Moves all of them at once
+    with NumPy operations instead of one object at a time. Every component is a typed array
+    with a row per slot, listed in COMPONENTS with its row shape, type and default value.
+    '''
+    COMPONENTS = {
+        'pos': ((2,), float, 0),
+        'prev': ((2,), float, 0),
+        'vel': ((2,), float, 0),
+        'rad': ((), float, 0),
+        'count': ((), float, np.inf),  # ticks left to live
+        'alive': ((), bool, False),
+        'grav': ((), float, 0),  # own gravity, added to the one given to step
+        'team': ((), np.int8, 0),
+        'bounce': ((), bool, True),  # rebounces from the corners, otherwise dies leaving the screen
+        'refl': ((2,), float, 0),  # own rebounce coefficients across and along the wall
+        'struck': ((), bool, False),  # has hit a target
+    }
+
+    def __init__(self, size=(800, 600), refl_ort=0.8, refl_par=0.9, capacity=64):
+        '''
+        Constructor method. Sets the screen size, the rebounce coefficients given to projectiles
+        added without their own, and the initial capacity.
+        '''
+        self.size = size
+        self.refl_ort = refl_ort
+        self.refl_par = refl_par
+        for name, (shape, dtype, default) in self.COMPONENTS.items():
+            setattr(self, name, np.full((capacity,) + shape, default, dtype=dtype))
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        '''
+        Number of live projectiles.
+        '''
+        return int(np.count_nonzero(self.alive))
+
+    def grow(self):
+        '''
+        Doubles the capacity of all arrays.
+        '''
+        n = len(self.rad)
+        for name, (shape, dtype, default) in self.COMPONENTS.items():
+            setattr(self, name, np.concatenate([getattr(self, name), np.full((n,) + shape, default, dtype=dtype)]))
+        self.free.extend(range(2*n - 1, n - 1, -1))
+
+    def live(self, team=None):
+        '''
+        Returns the slots of the live projectiles, only the ones of team if it is given.
+        '''
+        if team is None:
+            return np.flatnonzero(self.alive)
+        return np.flatnonzero(self.alive & (self.team == team))
+
+    def add(self, coord, vel, rad, count=np.inf, grav=0, team=0, bounce=True, refl=None):
+        '''
+        Stores a new live projectile and returns its slot. refl is the pair of its rebounce
+        coefficients across and along the wall, the store's ones by default.
+        '''
+        if not self.free:
+            self.grow()
+        slot = self.free.pop()
+        self.pos[slot] = coord
+        self.prev[slot] = coord
+        self.vel[slot] = vel
+        self.rad[slot] = rad
+        self.count[slot] = count
+        self.alive[slot] = True
+        self.grav[slot] = grav
+        self.team[slot] = team
+        self.bounce[slot] = bounce
+        self.refl[slot] = (self.refl_ort, self.refl_par) if refl is None else refl
+        self.struck[slot] = False
+        return slot
+
+    def remove(self, slot):
+        '''
+        Frees the slot for the next projectile.
+        '''
+        self.alive[slot] = False
+        self.free.append(slot)
+
+    def lerp(self, idx, alpha=1.0):
+        '''
+        Returns the positions of projectiles idx interpolated at alpha of the way from
+        their previous to their current position.
+        '''
+        if alpha >= 1:
+            return self.pos[idx]
+        prev = self.prev[idx]
+        return prev + (self.pos[idx] - prev) * alpha
+
+    def check_corners(self, idx, refl_ort=None, refl_par=None):
+        '''
+        Reflects velocities of projectiles idx that bump into the screen corners. Implements inelastic rebounce
+        with the given coefficients or, by default, the projectiles' own ones.
+        '''
+        pos = self.pos[idx]
+        vel = self.vel[idx]
+        refl = self.refl[idx]
+        self.reflect(pos, vel, self.rad[idx], refl[:, 0] if refl_ort is None else refl_ort,
+                     refl[:, 1] if refl_par is None else refl_par)
+        self.pos[idx] = pos
+        self.vel[idx] = vel
+
+    def reflect(self, pos, vel, rad, refl_ort, refl_par):
+        '''
+        Rebounces the gathered positions and velocities in place with the coefficients, numbers
+        or arrays with one per row. Most steps nobody touches a corner, then only the bounds are checked.
+        '''
+        refl_ort = np.broadcast_to(refl_ort, rad.shape)
+        refl_par = np.broadcast_to(refl_par, rad.shape)
+        for i in range(2):
+            x = pos[:, i]
+            limit = self.size[i] - rad
+            hit = (x < rad) | (x > limit)
+            if not hit.any():
+                continue
+            np.clip(x, rad, limit, out=x)
+            vel[hit, i] = -np.trunc(vel[hit, i] * refl_ort[hit])
+            vel[hit, 1-i] = np.trunc(vel[hit, 1-i] * refl_par[hit])
+
+    def step(self, time=1, grav=0, idx=None):
+        '''
+        Moves projectiles idx (all live ones by default) according to their velocities and time step,
+        applies gravity, rebounces them from the corners and marks the stopped, expired or,
+        for the ones that don't bounce, left ones dead.
+        The positions before the step are kept in prev for interpolated drawing.
+        '''
+        if idx is None:
+            idx = np.flatnonzero(self.alive)
+            if not len(idx):
+                return
+        pos = self.pos[idx]
+        vel = self.vel[idx]
+        rad = self.rad[idx]
+        bounce = self.bounce[idx]
+        refl = self.refl[idx]
+        self.prev[idx] = pos
+        vel[:, 1] += grav + self.grav[idx]
+        pos += time * vel
+        if bounce.all():
+            self.reflect(pos, vel, rad, refl[:, 0], refl[:, 1])
+            stay = True
+        else:
+            inside_pos, inside_vel = pos[bounce], vel[bounce]
+            self.reflect(inside_pos, inside_vel, rad[bounce], refl[bounce, 0], refl[bounce, 1])
+            pos[bounce], vel[bounce] = inside_pos, inside_vel
+            stay = bounce | ((pos >= -rad[:, None]) & (pos <= self.size)).all(axis=1)
+        self.pos[idx] = pos
+        self.vel[idx] = vel
+        count = self.count[idx] - 1
+        self.count[idx] = count
+        stopped = (vel**2).sum(axis=1) < 2**2
+        grounded = pos[:, 1] > self.size[1] - 2*rad
+        self.alive[idx] &= ~(stopped & grounded) & (count > 0) & stay
+
+
+class StoreField:
+    '''
+    Descriptor exposing one row of a ProjectileStore array as an attribute of a thin view object.
+    '''
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj.store, self.name)[obj.slot]
+
+    def __set__(self, obj, value):
+        getattr(obj.store, self.name)[obj.slot] = value
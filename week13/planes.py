@@ -0,0 +1,161 @@
+'''
+Plane waves. Every plane flies along a path fixed when it is added: a cubic Bezier curve with an
+optional sine wobble across its chord. Positions are computed from the ticks since the spawn for
+all planes at once, and a plane is removed when it reaches the end of its path.
+'''
+import math
+import numpy as np
+import assets
+
+
+def line(start, end):
+    '''
+    Returns the control points of the straight path from start to end flown at a constant speed.
+    '''
+    (x0, y0), (x1, y1) = start, end
+    return [(x0 + (x1 - x0) * k / 3, y0 + (y1 - y0) * k / 3) for k in range(4)]
+
+
+class Squadron:
+    '''
+    Structure of arrays holding the paths and positions of many planes. Like ProjectileStore,
+    every component is a typed array with a row per slot, listed in COMPONENTS. A plane whose
+    spawn tick hasn't come yet is alive but not shown, it isn't drawn or collided.
+    '''
+    COMPONENTS = {
+        'ctrl': ((4, 2), float, 0),  # Bezier control points
+        'normal': ((2,), float, 0),  # unit normal of the chord, the direction of the wobble
+        'amp': ((), float, 0),
+        'waves': ((), float, 0),  # sine periods along the path
+        'spawn': ((), float, 0),
+        'duration': ((), float, 1),  # ticks from the spawn to the end of the path
+        'pos': ((2,), float, 0),
+        'prev': ((2,), float, 0),
+        'rad': ((), float, 0),
+        'alive': ((), bool, False),
+        'shown': ((), bool, False),
+    }
+    plane = assets.Image('plane.png', (30, 30))
+
+    def __init__(self, size=(800, 600), capacity=16):
+        '''
+        Constructor method. Sets the screen size and the initial capacity.
+        '''
+        self.size = size
+        self.tick = 0
+        for name, (shape, dtype, default) in self.COMPONENTS.items():
+            setattr(self, name, np.full((capacity,) + shape, default, dtype=dtype))
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        '''
+        Number of live planes, the ones waiting for their spawn tick included.
+        '''
+        return int(np.count_nonzero(self.alive))
+
+    def grow(self):
+        '''
+        Doubles the capacity of all arrays.
+        '''
+        n = len(self.rad)
+        for name, (shape, dtype, default) in self.COMPONENTS.items():
+            setattr(self, name, np.concatenate([getattr(self, name), np.full((n,) + shape, default, dtype=dtype)]))
+        self.free.extend(range(2*n - 1, n - 1, -1))
+
+    def live(self):
+        '''
+        Returns the slots of the shown planes.
+        '''
+        return np.flatnonzero(self.alive & self.shown)
+
+    def add(self, ctrl, speed=10, amp=0, waves=0, delay=0, rad=30):
+        '''
+        Adds a plane flying along the Bezier curve with control points ctrl, starting delay ticks
+        after the current one. The flight takes the length of the control polygon divided by speed
+        ticks, which is exact for straight paths. With amp the plane wobbles across the chord
+        along waves periods of a sine. Returns the slot.
+        '''
+        if not self.free:
+            self.grow()
+        slot = self.free.pop()
+        ctrl = np.asarray(ctrl, dtype=float)
+        chord = ctrl[3] - ctrl[0]
+        length = np.hypot(*np.diff(ctrl, axis=0).T).sum()
+        self.ctrl[slot] = ctrl
+        self.normal[slot] = (-chord[1], chord[0]) / max(np.hypot(*chord), 1e-9)
+        self.amp[slot] = amp
+        self.waves[slot] = waves
+        self.spawn[slot] = self.tick + delay
+        self.duration[slot] = max(1, math.ceil(length / speed))
+        self.pos[slot] = self.prev[slot] = ctrl[0]
+        self.rad[slot] = rad
+        self.alive[slot] = True
+        self.shown[slot] = False
+        return slot
+
+    def evaluate(self, idx, t):
+        '''
+        Returns the positions of planes idx at the fractions t of their paths.
+        '''
+        s = 1 - t
+        weights = np.stack([s**3, 3*s*s*t, 3*s*t*t, t**3], axis=1)
+        pos = np.einsum('nk,nkd->nd', weights, self.ctrl[idx])
+        pos += (self.amp[idx] * np.sin(2*np.pi * self.waves[idx] * t))[:, None] * self.normal[idx]
+        return pos
+
+    def step(self):
+        '''
+        Advances the clock by one tick, moves the shown planes to their new positions and
+        frees the ones past the end of their paths. Planes shown for the first time don't
+        remember a previous position.
+        '''
+        self.tick += 1
+        idx = np.flatnonzero(self.alive)
+        if not len(idx):
+            return
+        t = (self.tick - self.spawn[idx]) / self.duration[idx]
+        done = t > 1
+        if done.any():
+            self.alive[idx[done]] = False
+            self.free.extend(idx[done].tolist())
+            idx, t = idx[~done], t[~done]
+        pos = self.evaluate(idx, np.clip(t, 0, 1))
+        self.prev[idx] = np.where(self.shown[idx][:, None], self.pos[idx], pos)
+        self.pos[idx] = pos
+        self.shown[idx] = t >= 0
+
+    def sprites(self, alpha=1.0):
+        '''
+        Returns the sprites of the shown planes centered at their positions interpolated at alpha.
+        '''
+        idx = self.live()
+        if not len(idx):
+            return []
+        prev = self.prev[idx]
+        pos = prev + (self.pos[idx] - prev) * alpha
+        image = self.plane
+        w, h = image.get_size()
+        return [(image, (int(x) - w//2, int(y) - h//2)) for x, y in pos.tolist()]
+
+
+def wave(squadron, rng, n, speed=10, spacing=6, delay=0):
+    '''
+    Adds a wave of n planes following each other spacing ticks apart along one random path
+    across the screen, a line, a sine or a Bezier curve, the first one after delay ticks.
+    The path starts and ends off the screen, so the planes come in and leave out of sight.
+    '''
+    w, h = squadron.size
+    margin = 30
+    xs = (-margin, w + margin)
+    if rng.randint(0, 1):
+        xs = xs[::-1]
+    start, end = (xs[0], rng.randint(0, h)), (xs[1], rng.randint(0, h))
+    kind = rng.randint(0, 2)
+    amp, waves = 0, 0
+    if kind == 2:
+        ctrl = [start, (rng.randint(0, w), rng.randint(0, h)), (rng.randint(0, w), rng.randint(0, h)), end]
+    else:
+        ctrl = line(start, end)
+        if kind == 1:
+            amp, waves = rng.randint(30, 120), rng.randint(1, 4)
+    return [squadron.add(ctrl, speed, amp, waves, delay + i * spacing) for i in range(n)]
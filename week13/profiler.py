@@ -0,0 +1,142 @@
+import csv
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+import numpy as np
+import pygame as pg
+
+NULL_PHASE = nullcontext()
+
+
+class Phase:
+    '''
+    Context manager timing one phase of a frame.
+    '''
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, time.perf_counter() - self.start)
+
+
+class FrameProfiler:
+    '''
+    Frame profiler. Keeps the durations of the last frames and of their phases, draws them
+    as an overlay and dumps them to CSV, JSON or Chrome trace files. While it is disabled
+    phase() returns a shared do-nothing context manager.
+    '''
+    def __init__(self, enabled=False, history=300, trace_size=100000):
+        '''
+        Constructor method. Sets how many frames are kept for statistics and how many
+        phase records are kept for the trace.
+        '''
+        self.enabled = enabled
+        self.history = history
+        self.phases = {}
+        self.frames = deque(maxlen=history)
+        self.trace = deque(maxlen=trace_size)
+        self.counts = {}
+        self.frame = 0
+        self.frame_start = time.perf_counter()
+        self.font = None
+
+    def phase(self, name):
+        '''
+        Returns a context manager timing the phase name.
+        '''
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def add(self, name, start, duration):
+        '''
+        Records a phase that started at start and took duration seconds.
+        '''
+        if name not in self.phases:
+            self.phases[name] = deque(maxlen=self.history)
+        self.phases[name].append(duration)
+        self.trace.append((self.frame, name, start, duration))
+
+    def end_frame(self, **counts):
+        '''
+        Closes the current frame and remembers the entity counts given as keyword arguments.
+        '''
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.add('frame', self.frame_start, now - self.frame_start)
+        self.frames.append(now - self.frame_start)
+        self.frame_start = now
+        self.counts = counts
+        self.frame += 1
+
+    def histogram(self, name, bins=20):
+        '''
+        Returns the histogram of the kept durations of the phase in milliseconds as (counts, bin edges).
+        '''
+        return np.histogram(np.array(self.phases.get(name, [])) * 1000, bins=bins)
+
+    def summary(self):
+        '''
+        Returns mean, median, 99th percentile and maximum of every phase in milliseconds.
+        '''
+        result = {}
+        for name, samples in self.phases.items():
+            ms = np.array(samples) * 1000
+            result[name] = {'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+                            'p99_ms': float(np.percentile(ms, 99)), 'max_ms': float(ms.max())}
+        return result
+
+    def draw(self, screen, pos=(580, 10), size=(210, 60), budget=1/60):
+        '''
+        Draws the frame time graph, the phase means and the entity counts. Returns the drawn rect.
+        The dashed level of the graph is the frame budget, the graph covers twice of it.
+        '''
+        if self.font is None:
+            pg.font.init()
+            self.font = pg.font.SysFont("dejavusansmono", 12)
+        x, y = pos
+        w, h = size
+        rect = pg.draw.rect(screen, (30, 30, 30), (x, y, w, h))
+        pg.draw.line(screen, (90, 90, 90), (x, y + h//2), (x + w, y + h//2))
+        if len(self.frames) > 1:
+            frames = list(self.frames)[-w:]
+            points = [(x + i * w / len(frames), y + h - min(h, h * t / (2 * budget))) for i, t in enumerate(frames)]
+            pg.draw.lines(screen, (0, 255, 0), False, points)
+        lines = ['{:<8}{:6.2f} ms'.format(name, value['mean_ms']) for name, value in self.summary().items()]
+        lines += ['{:<8}{:6}'.format(name, count) for name, count in self.counts.items()]
+        rects = [rect]
+        for i, line in enumerate(lines):
+            rects.append(screen.blit(self.font.render(line, True, (255, 255, 255)), (x, y + h + 2 + 14*i)))
+        return rect.unionall(rects)
+
+    def dump(self, path):
+        '''
+        Writes the trace to path. Files ending with .csv get one row per phase record,
+        files ending with .trace.json get Chrome trace events (chrome://tracing, Perfetto),
+        other files get the JSON summary with the histograms.
+        '''
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['frame', 'phase', 'start_ms', 'duration_ms'])
+                for frame, name, start, duration in self.trace:
+                    writer.writerow([frame, name, start * 1000, duration * 1000])
+        elif path.endswith('.trace.json'):
+            events = [{'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6,
+                       'pid': 0, 'tid': 0, 'args': {'frame': frame}}
+                      for frame, name, start, duration in self.trace]
+            with open(path, 'w') as file:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        else:
+            result = {'phases': self.summary(), 'counts': self.counts, 'histograms': {}}
+            for name in self.phases:
+                counts, edges = self.histogram(name)
+                result['histograms'][name] = {'counts': counts.tolist(), 'edges_ms': edges.tolist()}
+            with open(path, 'w') as file:
+                json.dump(result, file, indent=2)
@@ -0,0 +1,97 @@
+import pygame as pg
+
+
+class DirtyRenderer:
+    '''
+    Dirty rectangle renderer. Instead of clearing and flipping the whole screen every frame,
+    restores the background only under the rects drawn on the previous frame and sends only
+    the previous and the current rects to the display.
+    '''
+    def __init__(self, screen, background=(0, 0, 0), full_ratio=0.5):
+        '''
+        Constructor method. Sets the screen, the background (a color or a surface of the screen's size)
+        and the share of the screen area above which the whole screen is updated at once.
+        '''
+        self.screen = screen
+        if not isinstance(background, pg.Surface):
+            color = background
+            background = pg.Surface(screen.get_size()).convert(screen)
+            background.fill(color)
+        self.background = background
+        self.full_ratio = full_ratio
+        self.last = []
+        self.full = True
+
+    def invalidate(self):
+        '''
+        Makes the next frame clear and update the whole screen.
+        '''
+        self.full = True
+
+    def clear(self):
+        '''
+        Restores the background under the rects drawn on the previous frame.
+        '''
+        if self.full:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.last:
+                self.screen.blit(self.background, rect, rect)
+
+    def update(self, rects):
+        '''
+        Updates the display under the previous and the given rects and remembers the given ones.
+        '''
+        bounds = self.screen.get_rect()
+        rects = [bounds.clip(rect) for rect in rects if rect]
+        dirty = self.last + rects
+        area = sum(rect.width * rect.height for rect in dirty)
+        if self.full or area > self.full_ratio * bounds.width * bounds.height:
+            pg.display.update()
+            self.full = False
+        else:
+            pg.display.update(dirty)
+        self.last = rects
+
+
+class DigitAtlas:
+    '''
+    Pre-rendered digit glyphs and labels of one font and color. Composes text like "Total: -15"
+    from ready surfaces, so changing numbers don't need the font rasterizer.
+    '''
+    atlases = {}
+    chars = '0123456789-'
+
+    def __init__(self, font, color):
+        '''
+        Constructor method. Renders every digit and the minus sign once.
+        '''
+        self.font = font
+        self.color = color
+        self.glyphs = {char: font.render(char, True, color) for char in self.chars}
+        self.labels = {}
+
+    @classmethod
+    def get(cls, font, color):
+        '''
+        Returns the shared atlas of the font and color.
+        '''
+        key = (font, tuple(color))
+        if key not in cls.atlases:
+            cls.atlases[key] = cls(font, color)
+        return cls.atlases[key]
+
+    def compose(self, label, number):
+        '''
+        Returns a surface with the label followed by the number.
+        '''
+        if label not in self.labels:
+            self.labels[label] = self.font.render(label, True, self.color)
+        parts = [self.labels[label]] + [self.glyphs[char] for char in str(number)]
+        surf = pg.Surface((sum(part.get_width() for part in parts), max(part.get_height() for part in parts)),
+                          pg.SRCALPHA)
+        x = 0
+        for part in parts:
+            surf.blit(part, (x, 0))
+            x += part.get_width()
+        return surf
@@ -0,0 +1,117 @@
+import struct
+import sys
+import zlib
+import numpy as np
+import pygame as pg
+
+# Input codes. Every tick's input is its aim point and the list of codes of the events in it.
+QUIT, UP, DOWN, LEFT, RIGHT, FIRE_DOWN, FIRE_UP = range(1, 8)
+KEY_CODES = {pg.K_UP: UP, pg.K_DOWN: DOWN, pg.K_LEFT: LEFT, pg.K_RIGHT: RIGHT}
+
+MAGIC = b'CNRP'
+HEADER = struct.Struct('<4sBqH')  # magic, version, seed, number of targets
+TICK = struct.Struct('<hhIB')  # aim x, aim y, state hash, number of codes
+NO_AIM = -32768
+AIM_LIMIT = 32767  # largest aim coordinate a tick can hold
+
+
+def encode_events(events):
+    '''
+    Returns the input codes of pygame events. Events the game doesn't react to are dropped.
+    '''
+    codes = []
+    for event in events:
+        if event.type == pg.QUIT:
+            codes.append(QUIT)
+        elif event.type == pg.KEYDOWN and event.key in KEY_CODES:
+            codes.append(KEY_CODES[event.key])
+        elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
+            codes.append(FIRE_DOWN)
+        elif event.type == pg.MOUSEBUTTONUP and event.button == 1:
+            codes.append(FIRE_UP)
+    return codes
+
+
+def state_hash(*arrays):
+    '''
+    Returns a CRC32 of the given numbers and sequences of numbers.
+    '''
+    crc = 0
+    for array in arrays:
+        crc = zlib.crc32(np.asarray(array, dtype=np.float64).tobytes(), crc)
+    return crc
+
+
+class Recorder:
+    '''
+    Writes the seed and the per-tick input and state hash of a session to a compact binary file.
+    '''
+    def __init__(self, path, seed, n_targets):
+        '''
+        Constructor method. Opens the file and writes the header.
+        '''
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, 1, seed, n_targets))
+
+    def record(self, codes, aim, crc):
+        '''
+        Writes one tick.
+        '''
+        x, y = (NO_AIM, NO_AIM) if aim is None else (int(aim[0]), int(aim[1]))
+        self.file.write(TICK.pack(x, y, crc, len(codes)) + bytes(codes))
+
+    def close(self):
+        self.file.close()
+
+
+class Recording:
+    '''
+    A recorded session read back from a file.
+    '''
+    def __init__(self, path):
+        '''
+        Constructor method. Reads the header and all ticks.
+        '''
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, self.seed, self.n_targets = HEADER.unpack_from(data)
+        if magic != MAGIC or version != 1:
+            raise ValueError('{} is not a recording'.format(path))
+        self.ticks = []
+        offset = HEADER.size
+        while offset < len(data):
+            x, y, crc, n = TICK.unpack_from(data, offset)
+            offset += TICK.size
+            aim = None if x == NO_AIM else (x, y)
+            self.ticks.append((list(data[offset:offset + n]), aim, crc))
+            offset += n
+
+    def __len__(self):
+        return len(self.ticks)
+
+
+def verify(recording, manager_cls):
+    '''
+    Re-runs the recording headlessly on a new manager as fast as possible.
+    Returns the first tick whose state hash differs from the recorded one, or None.
+    '''
+    mgr = manager_cls(n_targets=recording.n_targets, seed=recording.seed)
+    for tick, (codes, aim, crc) in enumerate(recording.ticks):
+        mgr.step(codes, aim)
+        if mgr.state_hash() != crc:
+            return tick
+    return None
+
+
+if __name__ == "__main__":
+    import time
+    import Cannon_with_module
+    recording = Recording(sys.argv[1])
+    start = time.perf_counter()
+    tick = verify(recording, Cannon_with_module.Manager)
+    elapsed = time.perf_counter() - start
+    if tick is None:
+        print('{} ticks replayed in {:.2f} s, all states match'.format(len(recording), elapsed))
+    else:
+        print('state differs at tick {}'.format(tick))
+        sys.exit(1)